@@ -4,19 +4,42 @@ GeoCass Authentication
 API key authentication for vessel connections.
 Password hashing for user accounts.
 """
-import secrets
+import os
+import base64
 import hashlib
+import hmac
 import bcrypt
+from datetime import datetime
 from typing import Optional, Tuple
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import APIKeyHeader
 
 from . import database as db
+from .cache import TTLCache
 from .config import get_settings
 
 # API Key header
 api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
 
+# Settings read on every key/password check, resolved once at import
+_settings = get_settings()
+_api_key_prefix_bytes = _settings.api_key_prefix.encode('ascii')
+_secret_key = _settings.secret_key.encode('utf-8')
+
+# Verified API keys: raw key -> (key_record, expires_at). The owner is re-read
+# by ID on every hit, so user changes are never served stale from here.
+# Short TTL so revoked keys fall out quickly even if an invalidation is missed.
+_key_cache = TTLCache(maxsize=4096, ttl=60)
+
+# Successful password checks: HMAC(secret, password + hash) -> True
+# Plaintext passwords are never stored; failures are never cached.
+_password_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def invalidate_api_key(key_id: str):
+    """Drop any cached entries for a key ID (call after deleting the key)."""
+    _key_cache.remove_where(lambda _, entry: entry[0]['id'] == key_id)
+
 
 def hash_password(password: str) -> str:
     """Hash a password for storage."""
@@ -27,33 +50,44 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
+    cache_key = hmac.new(
+        _secret_key,
+        plain_password.encode('utf-8') + b'\0' + hashed_password.encode('utf-8'),
+        hashlib.sha256
+    ).digest()
+    if _password_cache.get(cache_key):
+        return True
+
     try:
-        return bcrypt.checkpw(
+        valid = bcrypt.checkpw(
             plain_password.encode('utf-8'),
             hashed_password.encode('utf-8')
         )
     except Exception:
         return False
 
+    if valid:
+        _password_cache.set(cache_key, True)
+    return valid
+
 
-def generate_api_key() -> Tuple[str, str, str]:
+def generate_api_key() -> Tuple[str, bytes, str]:
     """
     Generate a new API key.
 
     Returns:
         Tuple of (full_key, key_hash, key_prefix)
         - full_key: The complete key to give to the user (only shown once)
-        - key_hash: Hash to store in database
+        - key_hash: Raw SHA-256 digest to store in database
         - key_prefix: First 8 chars for identification
     """
-    settings = get_settings()
-
-    # Generate random key
-    random_part = secrets.token_urlsafe(32)
-    full_key = f"{settings.api_key_prefix}{random_part}"
+    # Generate random key (same alphabet as secrets.token_urlsafe)
+    random_part = base64.urlsafe_b64encode(os.urandom(32)).rstrip(b'=')
+    full_key_bytes = _api_key_prefix_bytes + random_part
+    full_key = full_key_bytes.decode('ascii')
 
     # Hash for storage
-    key_hash = hashlib.sha256(full_key.encode()).hexdigest()
+    key_hash = hashlib.sha256(full_key_bytes).digest()
 
     # Prefix for identification
     key_prefix = full_key[:8]
@@ -61,15 +95,15 @@ def generate_api_key() -> Tuple[str, str, str]:
     return full_key, key_hash, key_prefix
 
 
-def verify_api_key(api_key: str) -> Optional[str]:
+def authenticate_api_key(api_key: str) -> Optional[Tuple[dict, dict]]:
     """
-    Verify an API key and return the key ID if valid.
+    Verify an API key and resolve its key record and owner.
 
     Args:
-        api_key: The full API key
+        api_key: The full API key (optionally with "Bearer " prefix)
 
     Returns:
-        Key ID if valid, None otherwise
+        Tuple of (key_record, user) if valid, None otherwise
     """
     if not api_key:
         return None
@@ -78,32 +112,59 @@ def verify_api_key(api_key: str) -> Optional[str]:
     if api_key.startswith("Bearer "):
         api_key = api_key[7:]
 
+    # Recently verified keys skip the hash + prefix scan
+    cached = _key_cache.get(api_key)
+    if cached:
+        key_record, expires_at = cached
+        if expires_at is None or expires_at >= datetime.utcnow():
+            user = db.get_user_by_id(key_record['user_id'])
+            if user:
+                db.update_api_key_last_used(key_record['id'])
+                return key_record, user
+        _key_cache.pop(api_key)
+
     # Get prefix for lookup
     key_prefix = api_key[:8]
 
-    # Find matching keys
-    matching_keys = db.get_api_keys_by_prefix(key_prefix)
+    # Find matching keys (with their users, in one query)
+    matching_keys = db.get_keys_and_users_by_prefix(key_prefix)
     if not matching_keys:
         return None
 
     # Verify against hash
-    key_hash = hashlib.sha256(api_key.encode()).hexdigest()
-    for key_record in matching_keys:
-        if key_record['key_hash'] == key_hash:
+    key_hash = hashlib.sha256(api_key.encode()).digest()
+    for key_record, user in matching_keys:
+        if hmac.compare_digest(key_record['key_hash'], key_hash):
             # Check expiration
+            expires_at = None
             if key_record.get('expires_at'):
-                from datetime import datetime
-                if datetime.fromisoformat(key_record['expires_at']) < datetime.utcnow():
+                expires_at = datetime.fromisoformat(key_record['expires_at'])
+                if expires_at < datetime.utcnow():
                     return None
 
-            # Update last used
+            # Update last used (queued, written in batches)
             db.update_api_key_last_used(key_record['id'])
-            return key_record['id']
+            _key_cache.set(api_key, (key_record, expires_at))
+            return key_record, user
 
     return None
 
 
-async def get_current_user(
+def verify_api_key(api_key: str) -> Optional[str]:
+    """
+    Verify an API key and return the key ID if valid.
+
+    Args:
+        api_key: The full API key
+
+    Returns:
+        Key ID if valid, None otherwise
+    """
+    result = authenticate_api_key(api_key)
+    return result[0]['id'] if result else None
+
+
+def get_current_user(
     authorization: str = Security(api_key_header)
 ) -> dict:
     """
@@ -117,36 +178,21 @@ async def get_current_user(
             detail="Missing Authorization header"
         )
 
-    key_id = verify_api_key(authorization)
-    if not key_id:
+    result = authenticate_api_key(authorization)
+    if not result:
         raise HTTPException(
             status_code=401,
             detail="Invalid API key"
         )
 
-    # Get key record
-    key_record = db.get_api_key_by_id(key_id)
-    if not key_record:
-        raise HTTPException(
-            status_code=401,
-            detail="API key not found"
-        )
-
-    # Get user
-    user = db.get_user_by_id(key_record['user_id'])
-    if not user:
-        raise HTTPException(
-            status_code=401,
-            detail="User not found"
-        )
-
+    key_record, user = result
     return {
         "user": user,
         "api_key": key_record
     }
 
 
-async def get_optional_user(
+def get_optional_user(
     authorization: str = Security(api_key_header)
 ) -> Optional[dict]:
     """
@@ -157,18 +203,11 @@ async def get_optional_user(
     if not authorization:
         return None
 
-    key_id = verify_api_key(authorization)
-    if not key_id:
-        return None
-
-    key_record = db.get_api_key_by_id(key_id)
-    if not key_record:
-        return None
-
-    user = db.get_user_by_id(key_record['user_id'])
-    if not user:
+    result = authenticate_api_key(authorization)
+    if not result:
         return None
 
+    key_record, user = result
     return {
         "user": user,
         "api_key": key_record
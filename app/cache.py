@@ -0,0 +1,99 @@
+"""
+GeoCass In-Process Caches
+
+Small thread-safe LRU caches with per-entry expiry.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a fixed number of seconds.
+
+    With maxbytes, the cache is also bounded by the total sizeof(value) of its
+    entries; a value larger than maxbytes on its own is not kept.
+
+    clear() starts a new generation. A caller that reads `generation` before
+    building a value and passes it to set() never stores a value built from
+    data that was invalidated in the meantime.
+
+    Safe to share between the event loop and threadpool workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._sizeof = sizeof if maxbytes is not None else None
+        self._bytes = 0
+        self.generation = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _discard(self, key: Hashable) -> tuple:
+        """Remove an entry and its size from the running total (lock held)."""
+        entry = self._data.pop(key)
+        self._bytes -= entry[2]
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            value, expires, _ = entry
+            if expires < time.monotonic():
+                self._discard(key)
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Store a value, evicting the least recently used entries if full.
+        With `generation`, the value is dropped if the cache was cleared since.
+        """
+        size = self._sizeof(value) if self._sizeof else 0
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._data:
+                self._discard(key)
+            self._data[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.maxsize
+                or (self.maxbytes is not None and self._bytes > self.maxbytes)
+            ):
+                self._discard(next(iter(self._data)))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value."""
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._discard(key)[0]
+
+    def remove_where(self, predicate: Callable[[Hashable, Any], bool]):
+        """Remove every entry for which predicate(key, value) is true."""
+        with self._lock:
+            stale = [k for k, (v, _, _) in self._data.items() if predicate(k, v)]
+            for k in stale:
+                self._discard(k)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
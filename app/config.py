@@ -4,7 +4,6 @@ GeoCass Server Configuration
 import os
 from pathlib import Path
 from pydantic_settings import BaseSettings
-from functools import lru_cache
 
 
 class Settings(BaseSettings):
@@ -31,6 +30,19 @@ class Settings(BaseSettings):
     max_sync_per_minute: int = 5
     max_sync_per_day: int = 100
 
+    # Directory: accept ?page=N (OFFSET) in addition to ?cursor= pagination
+    directory_offset_pagination: bool = True
+
+    # Seconds between batched last_used_at / last_login writes
+    timestamp_flush_interval: float = 5.0
+
+    # Seconds between tag count rebuilds after syncs/deletes
+    tag_count_flush_interval: float = 2.0
+
+    # Render the most recently updated daemons' pages at startup
+    warm_cache: bool = False
+    warm_cache_limit: int = 200
+
     # Public URL
     public_url: str = "https://geocass.hearthweave.org"
 
@@ -38,22 +50,39 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_prefix = "GEOCASS_"
         extra = "ignore"  # Ignore unknown env vars for backwards compatibility
+        frozen = True  # Built once at import; never mutated
+
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Railway sets PORT without prefix - check for it
-        if "PORT" in os.environ:
-            self.port = int(os.environ["PORT"])
+def _load_settings() -> Settings:
+    """Build settings from the environment."""
+    overrides = {}
+    # Railway sets PORT without prefix - check for it
+    if "PORT" in os.environ:
+        overrides["port"] = int(os.environ["PORT"])
+    return Settings(**overrides)
+
+
+_SETTINGS = _load_settings()
 
 
-@lru_cache()
 def get_settings() -> Settings:
-    return Settings()
+    return _SETTINGS
+
+
+async def settings_dependency() -> Settings:
+    """
+    Settings for route handlers: `settings: Settings = Depends(settings_dependency)`.
+
+    Async so FastAPI resolves it on the event loop rather than sending a
+    sync dependency through the threadpool.
+    """
+    return _SETTINGS
 
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 TEMPLATES_DIR = BASE_DIR / "app" / "templates"
+STATIC_DIR = BASE_DIR / "app" / "static"
 
 
 def get_data_dir() -> Path:
@@ -4,35 +4,141 @@ GeoCass Database Layer
 SQLite database for users, API keys, and daemon homepages.
 """
 import sqlite3
-import json
+import threading
+import uuid
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 from .config import DATA_DIR
 
 DATABASE_PATH = DATA_DIR / "geocass.db"
 
+# Bump whenever init_database() gains new DDL or a data migration
+SCHEMA_VERSION = 5
+
+# Applied once when a connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+)
+
+# Statements shared by the helpers below. Kept as module constants so each
+# connection's statement cache sees the identical string every call.
+SQL_GET_USER_BY_ID = "SELECT * FROM users WHERE id = ?"
+SQL_GET_USER_BY_USERNAME = "SELECT * FROM users WHERE username = ?"
+SQL_GET_USER_BY_EMAIL = "SELECT * FROM users WHERE email = ?"
+SQL_UPDATE_USER_LAST_LOGIN = "UPDATE users SET last_login = ? WHERE id = ?"
+
+SQL_GET_API_KEY_BY_ID = "SELECT * FROM api_keys WHERE id = ?"
+SQL_GET_API_KEYS_BY_PREFIX = "SELECT * FROM api_keys WHERE key_prefix = ?"
+SQL_GET_KEYS_AND_USERS_BY_PREFIX = (
+    "SELECT ak.*, u.* FROM api_keys ak JOIN users u ON u.id = ak.user_id WHERE ak.key_prefix = ?"
+)
+SQL_GET_USER_API_KEYS = "SELECT * FROM api_keys WHERE user_id = ? ORDER BY created_at DESC"
+SQL_UPDATE_API_KEY_LAST_USED = "UPDATE api_keys SET last_used_at = ? WHERE id = ?"
+SQL_DELETE_API_KEY = "DELETE FROM api_keys WHERE id = ?"
+
+SQL_GET_DAEMON_BY_ID = "SELECT * FROM daemons WHERE id = ?"
+SQL_GET_DAEMON_BY_HANDLE = "SELECT * FROM daemons WHERE user_id = ? AND handle = ?"
+SQL_GET_DAEMON_BY_PATH = (
+    "SELECT d.* FROM daemons d JOIN users u ON d.user_id = u.id WHERE u.username = ? AND d.handle = ?"
+)
+SQL_GET_USER_DAEMONS = "SELECT * FROM daemons WHERE user_id = ? ORDER BY updated_at DESC"
+SQL_DELETE_DAEMON = "DELETE FROM daemons WHERE id = ?"
+SQL_DELETE_DAEMON_TAGS = "DELETE FROM daemon_tags WHERE daemon_id = ?"
+SQL_INSERT_DAEMON_TAGS = """
+    INSERT OR IGNORE INTO daemon_tags (daemon_id, tag)
+    SELECT ?1, value FROM json_each(CASE WHEN json_valid(?2) THEN ?2 ELSE '[]' END)
+    WHERE type = 'text'
+"""
 
-@contextmanager
-def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(str(DATABASE_PATH))
+SQL_GET_POPULAR_TAGS = (
+    "SELECT tag, daemon_count FROM directory_tags ORDER BY daemon_count DESC LIMIT ?"
+)
+
+# One persistent connection per thread
+_local = threading.local()
+
+# Pending last_used_at / last_login stamps, flushed in batches by
+# flush_pending_timestamps() instead of one UPDATE per request
+_pending_last_used: Dict[str, str] = {}
+_pending_last_login: Dict[str, str] = {}
+_pending_lock = threading.Lock()
+
+# Set when a sync or delete changes tags; flush_tag_counts() then rebuilds
+# directory_tags once for however many changes came in
+_tag_counts_dirty = threading.Event()
+
+
+def _now_iso() -> str:
+    """Current UTC time as the ISO string stored in timestamp columns."""
+    return datetime.utcnow().isoformat()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open and configure a new database connection."""
+    conn = sqlite3.connect(
+        str(DATABASE_PATH),
+        check_same_thread=False,
+        isolation_level=None,  # Transactions are managed by get_db()
+        cached_statements=256
+    )
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's database connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+    return conn
+
+
+@contextmanager
+def get_db(immediate: bool = False):
+    """
+    Context manager for a database transaction.
+
+    Reuses the thread's connection. Nested uses join the outer transaction.
+
+    Args:
+        immediate: Take the write lock up front (BEGIN IMMEDIATE). Use for
+            multi-statement writes so they commit as a single transaction.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
     try:
         yield conn
-        conn.commit()
+        conn.execute("COMMIT")
     except Exception:
-        conn.rollback()
+        conn.execute("ROLLBACK")
         raise
-    finally:
-        conn.close()
 
 
 def init_database():
-    """Initialize database schema."""
-    with get_db() as conn:
+    """
+    Initialize database schema.
+
+    Skipped entirely when the database is already at SCHEMA_VERSION.
+    """
+    with get_db(immediate=True) as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+
         # Users table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -57,7 +163,7 @@ def init_database():
             CREATE TABLE IF NOT EXISTS api_keys (
                 id TEXT PRIMARY KEY,
                 user_id TEXT NOT NULL REFERENCES users(id),
-                key_hash TEXT NOT NULL,
+                key_hash BLOB NOT NULL,
                 key_prefix TEXT NOT NULL,
                 label TEXT,
                 permissions_json TEXT,
@@ -69,6 +175,15 @@ def init_database():
         conn.execute("CREATE INDEX IF NOT EXISTS idx_api_keys_user ON api_keys(user_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_api_keys_prefix ON api_keys(key_prefix)")
 
+        # Older databases stored key_hash as a hex string; convert to raw digest
+        hex_rows = conn.execute(
+            "SELECT id, key_hash FROM api_keys WHERE typeof(key_hash) = 'text'"
+        ).fetchall()
+        conn.executemany(
+            "UPDATE api_keys SET key_hash = ? WHERE id = ?",
+            [(bytes.fromhex(row['key_hash']), row['id']) for row in hex_rows]
+        )
+
         # Daemons table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS daemons (
@@ -92,6 +207,30 @@ def init_database():
         conn.execute("CREATE INDEX IF NOT EXISTS idx_daemons_user ON daemons(user_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_daemons_visibility ON daemons(visibility)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_daemons_updated ON daemons(updated_at)")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daemons_public_updated
+            ON daemons(visibility, updated_at DESC, id DESC)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daemons_public_name
+            ON daemons(visibility, display_name, id)
+        """)
+
+        # Daemon tags (normalized from tags_json for indexed tag filtering)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daemon_tags (
+                daemon_id TEXT NOT NULL REFERENCES daemons(id),
+                tag TEXT NOT NULL,
+                PRIMARY KEY (daemon_id, tag)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_daemon_tags_tag ON daemon_tags(tag)")
+        conn.execute("""
+            INSERT OR IGNORE INTO daemon_tags (daemon_id, tag)
+            SELECT d.id, j.value FROM daemons d,
+                json_each(CASE WHEN json_valid(d.tags_json) THEN d.tags_json ELSE '[]' END) j
+            WHERE d.tags_json IS NOT NULL AND j.type = 'text'
+        """)
 
         # Directory tags table
         conn.execute("""
@@ -125,6 +264,26 @@ def init_database():
             )
         """)
 
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daemons_pub_meta
+            ON daemons(visibility, updated_at)
+            WHERE identity_meta_json IS NOT NULL
+        """)
+
+        # Discovery filtered by lineage: seek, then read already in order
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daemons_discover_lineage
+            ON daemons(lineage, updated_at DESC)
+            WHERE visibility = 'public' AND identity_meta_json IS NOT NULL
+        """)
+
+        # Planner statistics. The UNIQUE(user_id, handle) autoindex already
+        # serves get_daemon_by_path; stats keep the planner choosing it over
+        # idx_daemons_user as tables grow.
+        conn.execute("ANALYZE")
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
 
 # =============================================================================
 # User Operations
@@ -140,7 +299,7 @@ def create_user(
     oauth_id: str = None
 ) -> Dict[str, Any]:
     """Create a new user."""
-    now = datetime.utcnow().isoformat()
+    now = _now_iso()
     with get_db() as conn:
         conn.execute("""
             INSERT INTO users (id, username, display_name, email, password_hash,
@@ -155,37 +314,28 @@ def create_user(
 def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     """Get user by ID."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM users WHERE id = ?", (user_id,)
-        ).fetchone()
+        row = conn.execute(SQL_GET_USER_BY_ID, (user_id,)).fetchone()
         return dict(row) if row else None
 
 
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """Get user by username."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM users WHERE username = ?", (username,)
-        ).fetchone()
+        row = conn.execute(SQL_GET_USER_BY_USERNAME, (username,)).fetchone()
         return dict(row) if row else None
 
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user by email."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM users WHERE email = ?", (email,)
-        ).fetchone()
+        row = conn.execute(SQL_GET_USER_BY_EMAIL, (email,)).fetchone()
         return dict(row) if row else None
 
 
 def update_user_last_login(user_id: str):
-    """Update user's last login timestamp."""
-    with get_db() as conn:
-        conn.execute(
-            "UPDATE users SET last_login = ? WHERE id = ?",
-            (datetime.utcnow().isoformat(), user_id)
-        )
+    """Queue an update of the user's last login timestamp."""
+    with _pending_lock:
+        _pending_last_login[user_id] = _now_iso()
 
 
 # =============================================================================
@@ -195,12 +345,12 @@ def update_user_last_login(user_id: str):
 def create_api_key(
     key_id: str,
     user_id: str,
-    key_hash: str,
+    key_hash: bytes,
     key_prefix: str,
     label: str = None
 ) -> Dict[str, Any]:
     """Create a new API key."""
-    now = datetime.utcnow().isoformat()
+    now = _now_iso()
     with get_db() as conn:
         conn.execute("""
             INSERT INTO api_keys (id, user_id, key_hash, key_prefix, label, created_at)
@@ -213,44 +363,51 @@ def create_api_key(
 def get_api_key_by_id(key_id: str) -> Optional[Dict[str, Any]]:
     """Get API key by ID."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM api_keys WHERE id = ?", (key_id,)
-        ).fetchone()
+        row = conn.execute(SQL_GET_API_KEY_BY_ID, (key_id,)).fetchone()
         return dict(row) if row else None
 
 
 def get_api_keys_by_prefix(prefix: str) -> List[Dict[str, Any]]:
     """Get API keys matching a prefix."""
     with get_db() as conn:
-        rows = conn.execute(
-            "SELECT * FROM api_keys WHERE key_prefix = ?", (prefix,)
-        ).fetchall()
+        rows = conn.execute(SQL_GET_API_KEYS_BY_PREFIX, (prefix,)).fetchall()
         return [dict(row) for row in rows]
 
 
-def get_user_api_keys(user_id: str) -> List[Dict[str, Any]]:
+def get_keys_and_users_by_prefix(prefix: str) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Get API keys matching a prefix together with their owners, in one query.
+
+    Returns:
+        List of (key_record, user_record) tuples
+    """
+    with get_db() as conn:
+        cursor = conn.execute(SQL_GET_KEYS_AND_USERS_BY_PREFIX, (prefix,))
+        columns = [c[0] for c in cursor.description]
+        split = columns.index("id", 1)  # users.* starts at its own "id" column
+        key_columns, user_columns = columns[:split], columns[split:]
+        return [
+            (dict(zip(key_columns, row[:split])), dict(zip(user_columns, row[split:])))
+            for row in cursor.fetchall()
+        ]
+
+
+def get_user_api_keys(user_id: str) -> List[sqlite3.Row]:
     """Get all API keys for a user."""
     with get_db() as conn:
-        rows = conn.execute(
-            "SELECT * FROM api_keys WHERE user_id = ? ORDER BY created_at DESC",
-            (user_id,)
-        ).fetchall()
-        return [dict(row) for row in rows]
+        return conn.execute(SQL_GET_USER_API_KEYS, (user_id,)).fetchall()
 
 
 def update_api_key_last_used(key_id: str):
-    """Update API key's last used timestamp."""
-    with get_db() as conn:
-        conn.execute(
-            "UPDATE api_keys SET last_used_at = ? WHERE id = ?",
-            (datetime.utcnow().isoformat(), key_id)
-        )
+    """Queue an update of the API key's last used timestamp."""
+    with _pending_lock:
+        _pending_last_used[key_id] = _now_iso()
 
 
 def delete_api_key(key_id: str) -> bool:
     """Delete an API key."""
     with get_db() as conn:
-        cursor = conn.execute("DELETE FROM api_keys WHERE id = ?", (key_id,))
+        cursor = conn.execute(SQL_DELETE_API_KEY, (key_id,))
         return cursor.rowcount > 0
 
 
@@ -267,7 +424,7 @@ def create_daemon(
     lineage: str = None
 ) -> Dict[str, Any]:
     """Create a new daemon entry."""
-    now = datetime.utcnow().isoformat()
+    now = _now_iso()
     with get_db() as conn:
         conn.execute("""
             INSERT INTO daemons (id, user_id, handle, display_name, tagline,
@@ -281,184 +438,411 @@ def create_daemon(
 def get_daemon_by_id(daemon_id: str) -> Optional[Dict[str, Any]]:
     """Get daemon by ID."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM daemons WHERE id = ?", (daemon_id,)
-        ).fetchone()
+        row = conn.execute(SQL_GET_DAEMON_BY_ID, (daemon_id,)).fetchone()
         return dict(row) if row else None
 
 
 def get_daemon_by_handle(user_id: str, handle: str) -> Optional[Dict[str, Any]]:
     """Get daemon by user ID and handle."""
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM daemons WHERE user_id = ? AND handle = ?",
-            (user_id, handle)
-        ).fetchone()
+        row = conn.execute(SQL_GET_DAEMON_BY_HANDLE, (user_id, handle)).fetchone()
         return dict(row) if row else None
 
 
 def get_daemon_by_path(username: str, handle: str) -> Optional[Dict[str, Any]]:
     """Get daemon by username and handle (for URL routing)."""
     with get_db() as conn:
-        row = conn.execute("""
-            SELECT d.* FROM daemons d
-            JOIN users u ON d.user_id = u.id
-            WHERE u.username = ? AND d.handle = ?
-        """, (username, handle)).fetchone()
+        row = conn.execute(SQL_GET_DAEMON_BY_PATH, (username, handle)).fetchone()
         return dict(row) if row else None
 
 
-def get_user_daemons(user_id: str) -> List[Dict[str, Any]]:
+def get_user_daemons(user_id: str) -> List[sqlite3.Row]:
     """Get all daemons for a user."""
     with get_db() as conn:
-        rows = conn.execute(
-            "SELECT * FROM daemons WHERE user_id = ? ORDER BY updated_at DESC",
-            (user_id,)
-        ).fetchall()
-        return [dict(row) for row in rows]
+        return conn.execute(SQL_GET_USER_DAEMONS, (user_id,)).fetchall()
+
+
+# Daemon columns that callers may set through update_daemon / upsert_daemon
+DAEMON_UPDATE_FIELDS = (
+    'display_name', 'tagline', 'lineage', 'visibility',
+    'homepage_json', 'stylesheet', 'tags_json', 'identity_meta_json'
+)
 
 
 def update_daemon(daemon_id: str, **kwargs) -> Optional[Dict[str, Any]]:
     """Update daemon fields."""
-    allowed_fields = {
-        'display_name', 'tagline', 'lineage', 'visibility',
-        'homepage_json', 'stylesheet', 'tags_json', 'identity_meta_json'
-    }
-
-    updates = {k: v for k, v in kwargs.items() if k in allowed_fields}
+    updates = {k: v for k, v in kwargs.items() if k in DAEMON_UPDATE_FIELDS}
     if not updates:
         return get_daemon_by_id(daemon_id)
 
-    updates['updated_at'] = datetime.utcnow().isoformat()
+    now = _now_iso()
+    updates['updated_at'] = now
     if 'homepage_json' in updates:
-        updates['last_synced_at'] = updates['updated_at']
+        updates['last_synced_at'] = now
 
     set_clause = ", ".join(f"{k} = ?" for k in updates.keys())
     values = list(updates.values()) + [daemon_id]
 
     with get_db() as conn:
         conn.execute(f"UPDATE daemons SET {set_clause} WHERE id = ?", values)
+        if 'tags_json' in updates:
+            set_daemon_tags(conn, daemon_id, updates['tags_json'])
 
     return get_daemon_by_id(daemon_id)
 
 
+def set_daemon_tags(conn: sqlite3.Connection, daemon_id: str, tags_json: Optional[str]):
+    """
+    Replace a daemon's normalized tag rows (within the caller's transaction).
+
+    The JSON array is expanded by SQLite's json_each, so each tag is stored
+    and matched exactly rather than parsed in Python.
+    """
+    conn.execute(SQL_DELETE_DAEMON_TAGS, (daemon_id,))
+    if tags_json:
+        conn.execute(SQL_INSERT_DAEMON_TAGS, (daemon_id, tags_json))
+
+
+def delete_daemon(daemon_id: str) -> bool:
+    """Delete a daemon and its tag rows."""
+    with get_db() as conn:
+        conn.execute(SQL_DELETE_DAEMON_TAGS, (daemon_id,))
+        cursor = conn.execute(SQL_DELETE_DAEMON, (daemon_id,))
+        return cursor.rowcount > 0
+
+
 def upsert_daemon(
     user_id: str,
     handle: str,
     display_name: str,
     **kwargs
 ) -> Dict[str, Any]:
-    """Create or update a daemon."""
-    existing = get_daemon_by_handle(user_id, handle)
-    if existing:
-        return update_daemon(existing['id'], display_name=display_name, **kwargs)
-    else:
-        import uuid
-        daemon_id = str(uuid.uuid4())
-        create_daemon(
-            daemon_id=daemon_id,
-            user_id=user_id,
-            handle=handle,
-            display_name=display_name,
-            tagline=kwargs.get('tagline'),
-            lineage=kwargs.get('lineage')
-        )
-        return update_daemon(daemon_id, **kwargs)
+    """
+    Create or update a daemon.
+
+    Runs as a single INSERT ... ON CONFLICT(user_id, handle) DO UPDATE ...
+    RETURNING *, so only the fields passed in are written on update.
+    """
+    now = _now_iso()
+    fields = {'display_name': display_name}
+    fields.update((k, v) for k, v in kwargs.items() if k in DAEMON_UPDATE_FIELDS)
+    fields['updated_at'] = now
+    if 'homepage_json' in fields:
+        fields['last_synced_at'] = now
+
+    columns = ['id', 'user_id', 'handle', 'created_at'] + list(fields)
+    values = [str(uuid.uuid4()), user_id, handle, now] + list(fields.values())
+    query = f"""
+        INSERT INTO daemons ({", ".join(columns)})
+        VALUES ({", ".join("?" for _ in columns)})
+        ON CONFLICT(user_id, handle) DO UPDATE SET
+            {", ".join(f"{k} = excluded.{k}" for k in fields)}
+        RETURNING *
+    """
+
+    with get_db(immediate=True) as conn:
+        daemon = dict(conn.execute(query, values).fetchone())
+        if 'tags_json' in fields:
+            set_daemon_tags(conn, daemon['id'], fields['tags_json'])
+
+    return daemon
 
 
 # =============================================================================
 # Directory Operations
 # =============================================================================
 
-def get_public_daemons(
-    limit: int = 20,
-    offset: int = 0,
+# Directory listing entry rendered by SQLite as a JSON object. tags_json is
+# spliced in as-is (never parsed in Python); the bound parameter is public_url.
+# orjson.Fragment could splice tags_json too, but would still need a Python
+# dict per row; here the rows are joined straight into the response bytes.
+SQL_DAEMON_ITEM_JSON = """
+    json_object(
+        'id', d.id,
+        'handle', d.handle,
+        'display_name', d.display_name,
+        'tagline', d.tagline,
+        'lineage', d.lineage,
+        'visibility', COALESCE(NULLIF(d.visibility, ''), 'public'),
+        'tags', CASE WHEN json_valid(d.tags_json) THEN json(d.tags_json) END,
+        'username', u.username,
+        'url', ? || '/' || u.username || '/' || d.handle,
+        'created_at', d.created_at,
+        'updated_at', d.updated_at
+    ) AS item
+"""
+
+
+def _directory_select(public_url: Optional[str]) -> tuple:
+    """Select list for directory rows: full rows, or prebuilt JSON items."""
+    if public_url is None:
+        return "d.*, u.username", ()
+    return "d.id, d.updated_at, d.display_name, " + SQL_DAEMON_ITEM_JSON, (public_url,)
+
+
+def _public_daemons_query(
+    select: str,
     tag: str = None,
     lineage: str = None,
-    sort: str = 'recent'
-) -> List[Dict[str, Any]]:
-    """Get public daemons for directory."""
-    query = """
-        SELECT d.*, u.username
+    sort: str = None,
+    after: Tuple[str, str] = None,
+    select_params: tuple = ()
+) -> tuple:
+    """
+    Build the filtered public-daemon query. Returns (sql, params).
+
+    `after` is a keyset cursor - (updated_at, id) for sort='recent',
+    (display_name, id) for sort='name' - and only rows strictly after that
+    position in the ordering are returned.
+    """
+    query = f"""
+        SELECT {select}
         FROM daemons d
         JOIN users u ON d.user_id = u.id
-        WHERE d.visibility = 'public'
     """
-    params = []
+    params = list(select_params)
 
     if tag:
-        query += " AND d.tags_json LIKE ?"
-        params.append(f'%"{tag}"%')
+        query += " JOIN daemon_tags t ON t.daemon_id = d.id AND t.tag = ?"
+        params.append(tag)
+
+    query += " WHERE d.visibility = 'public'"
 
     if lineage:
         query += " AND d.lineage = ?"
         params.append(lineage)
 
+    if after and sort == 'recent':
+        query += " AND (d.updated_at, d.id) < (?, ?)"
+        params.extend(after)
+    elif after and sort == 'name':
+        query += " AND (d.display_name, d.id) > (?, ?)"
+        params.extend(after)
+
     if sort == 'recent':
-        query += " ORDER BY d.updated_at DESC"
+        query += " ORDER BY d.updated_at DESC, d.id DESC"
     elif sort == 'name':
-        query += " ORDER BY d.display_name ASC"
+        query += " ORDER BY d.display_name ASC, d.id ASC"
+
+    return query, params
+
+
+def get_public_daemons(
+    limit: int = 20,
+    offset: int = 0,
+    tag: str = None,
+    lineage: str = None,
+    sort: str = 'recent',
+    after: Tuple[str, str] = None,
+    public_url: str = None
+) -> List[sqlite3.Row]:
+    """
+    Get public daemons for directory.
+
+    Pass `after` - the last row's (updated_at, id), or (display_name, id) for
+    sort='name' - with offset=0 for keyset pagination; the index seek makes
+    deep pages as cheap as the first.
+
+    With `public_url`, rows hold only id, updated_at, display_name and an
+    `item` column with the API listing entry already serialized as JSON.
+    """
+    select, select_params = _directory_select(public_url)
+    query, params = _public_daemons_query(select, tag, lineage, sort, after, select_params)
+    query += " LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    with get_db() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def get_public_daemons_with_count(
+    limit: int = 20,
+    offset: int = 0,
+    tag: str = None,
+    lineage: str = None,
+    sort: str = 'recent',
+    public_url: str = None
+) -> Tuple[List[sqlite3.Row], int]:
+    """
+    Get a page of public daemons plus the total match count in one query.
 
+    `public_url` selects prebuilt JSON items as in get_public_daemons().
+
+    Returns:
+        Tuple of (daemons, total); each row also carries a `_total` column
+    """
+    select, select_params = _directory_select(public_url)
+    query, params = _public_daemons_query(
+        select + ", COUNT(*) OVER () AS _total", tag, lineage, sort,
+        select_params=select_params
+    )
     query += " LIMIT ? OFFSET ?"
     params.extend([limit, offset])
 
     with get_db() as conn:
         rows = conn.execute(query, params).fetchall()
-        return [dict(row) for row in rows]
+
+    if not rows:
+        # Past the last page: the window has nothing to report
+        total = count_public_daemons(tag=tag, lineage=lineage) if offset else 0
+        return [], total
+
+    return rows, rows[0]["_total"]
 
 
 def count_public_daemons(tag: str = None, lineage: str = None) -> int:
     """Count public daemons for pagination."""
-    query = "SELECT COUNT(*) FROM daemons WHERE visibility = 'public'"
-    params = []
+    query, params = _public_daemons_query("COUNT(*)", tag, lineage)
 
-    if tag:
-        query += " AND tags_json LIKE ?"
-        params.append(f'%"{tag}"%')
+    with get_db() as conn:
+        return conn.execute(query, params).fetchone()[0]
+
+
+def discover_public_daemons(
+    lineage: str = None,
+    values: List[str] = None,
+    interests: List[str] = None,
+    looking_for: List[str] = None,
+    limit: int = 20
+) -> List[sqlite3.Row]:
+    """
+    Get public daemons whose identity metadata matches the filters.
+
+    Each list filter matches if any of its entries appears in the
+    corresponding identity_meta array; filters are ANDed together.
+    """
+    query = """
+        SELECT d.*, u.username
+        FROM daemons d
+        JOIN users u ON d.user_id = u.id
+        WHERE d.visibility = 'public'
+        AND d.identity_meta_json IS NOT NULL
+    """
+    params = []
 
     if lineage:
-        query += " AND lineage = ?"
+        query += " AND d.lineage = ?"
         params.append(lineage)
 
+    meta_filters = (
+        ('values', values),
+        ('interests', interests),
+        ('looking_for', looking_for)
+    )
+    for field, wanted in meta_filters:
+        if not wanted:
+            continue
+        query += f"""
+            AND EXISTS (
+                SELECT 1 FROM json_each(
+                    CASE WHEN json_valid(d.identity_meta_json) THEN d.identity_meta_json ELSE '{{}}' END,
+                    '$.{field}'
+                ) je
+                WHERE je.value IN ({", ".join("?" for _ in wanted)})
+            )
+        """
+        params.extend(wanted)
+
+    query += " ORDER BY d.updated_at DESC LIMIT ?"
+    params.append(limit)
+
     with get_db() as conn:
-        return conn.execute(query, params).fetchone()[0]
+        return conn.execute(query, params).fetchall()
 
 
-def get_popular_tags(limit: int = 20) -> List[Dict[str, Any]]:
+def get_popular_tags(limit: int = 20) -> List[sqlite3.Row]:
     """Get popular tags from directory."""
     with get_db() as conn:
-        rows = conn.execute(
-            "SELECT tag, daemon_count FROM directory_tags ORDER BY daemon_count DESC LIMIT ?",
-            (limit,)
-        ).fetchall()
-        return [dict(row) for row in rows]
+        return conn.execute(SQL_GET_POPULAR_TAGS, (limit,)).fetchall()
+
+
+def get_directory_listing(
+    daemon_limit: int = 50,
+    tag_limit: int = 20
+) -> Tuple[List[sqlite3.Row], List[sqlite3.Row]]:
+    """
+    Get the most recent public daemons and the popular tags together.
+
+    Both reads share one transaction, so the page sees a single snapshot.
+    Daemon rows carry a `tags_display` column: up to three tags joined with
+    ", ", or NULL when there are none.
+
+    Returns:
+        Tuple of (daemons, tags)
+    """
+    # First three tags pre-joined for display, so callers never parse tags_json
+    query, params = _public_daemons_query("""
+        d.*, u.username,
+        (SELECT group_concat(je.value, ', ') FROM (
+            SELECT value FROM json_each(
+                CASE WHEN json_valid(d.tags_json) THEN d.tags_json ELSE '[]' END
+            ) ORDER BY key LIMIT 3
+        ) je) AS tags_display
+    """, sort='recent')
+    query += " LIMIT ?"
+    params.append(daemon_limit)
+
+    with get_db() as conn:
+        return (
+            conn.execute(query, params).fetchall(),
+            get_popular_tags(limit=tag_limit)
+        )
 
 
 def update_tag_counts():
     """Recalculate tag counts from daemon data."""
-    with get_db() as conn:
-        # Get all tags from public daemons
-        rows = conn.execute("""
-            SELECT tags_json FROM daemons
-            WHERE visibility = 'public' AND tags_json IS NOT NULL
-        """).fetchall()
-
-        tag_counts = {}
-        for row in rows:
-            try:
-                tags = json.loads(row[0])
-                for tag in tags:
-                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
-            except (json.JSONDecodeError, TypeError):
-                pass
-
-        # Update counts
+    with get_db(immediate=True) as conn:
         conn.execute("DELETE FROM directory_tags")
-        for tag, count in tag_counts.items():
-            conn.execute(
-                "INSERT INTO directory_tags (tag, daemon_count) VALUES (?, ?)",
-                (tag, count)
-            )
+        conn.execute("""
+            INSERT INTO directory_tags (tag, daemon_count)
+            SELECT t.tag, COUNT(*) FROM daemon_tags t
+            JOIN daemons d ON d.id = t.daemon_id
+            WHERE d.visibility = 'public'
+            GROUP BY t.tag
+        """)
+
+
+# =============================================================================
+# Deferred Writes
+# =============================================================================
+
+def mark_tag_counts_dirty():
+    """
+    Queue a directory_tags rebuild for the next flush_tag_counts(). Any number
+    of daemon writes (syncs or deletes) between flushes cost a single rebuild.
+    """
+    _tag_counts_dirty.set()
+
+
+def flush_tag_counts() -> bool:
+    """
+    Rebuild directory_tags if a change was queued.
+
+    Returns:
+        True if the counts were recalculated
+    """
+    if not _tag_counts_dirty.is_set():
+        return False
+    # Clear first: a change queued during the rebuild gets its own pass
+    _tag_counts_dirty.clear()
+    update_tag_counts()
+    return True
+
+
+def flush_pending_timestamps():
+    """Write queued last_used_at / last_login stamps in one transaction."""
+    with _pending_lock:
+        last_used = [(ts, key_id) for key_id, ts in _pending_last_used.items()]
+        last_login = [(ts, user_id) for user_id, ts in _pending_last_login.items()]
+        _pending_last_used.clear()
+        _pending_last_login.clear()
+
+    if not last_used and not last_login:
+        return
+
+    with get_db(immediate=True) as conn:
+        conn.executemany(SQL_UPDATE_API_KEY_LAST_USED, last_used)
+        conn.executemany(SQL_UPDATE_USER_LAST_LOGIN, last_login)
 
 
 # Initialize database on import
@@ -3,20 +3,57 @@ GeoCass Server
 
 Central hosting service for daemon homepages.
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from .config import get_settings
+from . import database as db
 from .routers import sync, users, directory, pages
 
 settings = get_settings()
 
+
+async def flush_timestamps_periodically():
+    """Background task: write batched last-used/last-login stamps."""
+    while True:
+        await asyncio.sleep(settings.timestamp_flush_interval)
+        await asyncio.to_thread(db.flush_pending_timestamps)
+
+
+async def flush_tag_counts_periodically():
+    """Background task: rebuild tag counts after syncs, once per interval."""
+    while True:
+        await asyncio.sleep(settings.tag_count_flush_interval)
+        if await asyncio.to_thread(db.flush_tag_counts):
+            directory.invalidate_directory_cache()
+            pages.invalidate_page_caches()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background tasks; flush pending writes on shutdown."""
+    if settings.warm_cache:
+        await asyncio.to_thread(pages.warm_page_caches, settings.warm_cache_limit)
+    flush_task = asyncio.create_task(flush_timestamps_periodically())
+    tags_task = asyncio.create_task(flush_tag_counts_periodically())
+    yield
+    flush_task.cancel()
+    tags_task.cancel()
+    db.flush_pending_timestamps()
+    db.flush_tag_counts()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="Central hosting service for daemon homepages",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -28,6 +65,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress HTML/JSON bodies; tiny responses aren't worth the CPU. Pages
+# that send their own pre-gzipped bytes set Content-Encoding, which the
+# middleware leaves alone (starlette>=0.27.0, pinned in requirements.txt)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Include routers
 app.include_router(sync.router)
 app.include_router(users.router)
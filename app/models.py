@@ -3,7 +3,7 @@ GeoCass Pydantic Models
 
 Request/response models for the API.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from pydantic import BaseModel, Field, EmailStr
 from datetime import datetime
 
@@ -118,7 +118,7 @@ class SyncRequest(BaseModel):
     homepage: HomepageData
     tags: Optional[List[str]] = Field(None, max_length=10)
     identity_meta: Optional[IdentityMeta] = None
-    visibility: Optional[str] = Field('public', pattern=r'^(public|unlisted|private)$')
+    visibility: Optional[Literal['public', 'unlisted', 'private']] = 'public'
 
 
 class SyncResponse(BaseModel):
@@ -162,7 +162,7 @@ class DirectoryQuery(BaseModel):
     """Query parameters for directory browsing."""
     tag: Optional[str] = None
     lineage: Optional[str] = None
-    sort: Optional[str] = Field('recent', pattern=r'^(recent|name)$')
+    sort: Optional[Literal['recent', 'name']] = 'recent'
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
 
@@ -170,10 +170,11 @@ class DirectoryQuery(BaseModel):
 class DirectoryResponse(BaseModel):
     """Response for directory listing."""
     daemons: List[DaemonResponse]
-    total: int
+    total: Optional[int] = None  # Omitted (null) on cursor pages
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page
 
 
 class TagResponse(BaseModel):
@@ -3,196 +3,277 @@ GeoCass Directory Router
 
 Public endpoints for browsing and discovering daemons.
 """
-import json
+import base64
+import binascii
 import math
-from typing import Optional, List
-from fastapi import APIRouter, Query
+from operator import itemgetter
+from typing import Optional, List, Literal, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from ..models import (
-    DirectoryResponse, DaemonResponse, TagsResponse, TagResponse,
-    DiscoveryResponse, DiscoveryDaemon, IdentityMeta
+    DirectoryResponse, TagsResponse, TagResponse, DiscoveryResponse
 )
 from .. import database as db
-from ..config import get_settings
+from ..cache import TTLCache
+from ..config import Settings, settings_dependency
 
 router = APIRouter(prefix="/api/v1", tags=["directory"])
 
+# Short-lived response caches for the hottest read-only endpoints. Values
+# are stored with the generation read before querying, so a request racing
+# invalidate_directory_cache() can't put pre-change data back
+_tags_cache = TTLCache(maxsize=128, ttl=60)
+_directory_cache = TTLCache(maxsize=64, ttl=10)
+_count_cache = TTLCache(maxsize=1, ttl=30)
+
+
+def invalidate_directory_cache():
+    """Drop cached directory/tag responses (call after daemons change)."""
+    _tags_cache.clear()
+    _directory_cache.clear()
+    _count_cache.clear()
+
+
+def count_all_public_daemons() -> int:
+    """Unfiltered public daemon count, cached so listings don't rescan for it."""
+    total = _count_cache.get("all")
+    if total is None:
+        generation = _count_cache.generation
+        total = db.count_public_daemons()
+        _count_cache.set("all", total, generation)
+    return total
+
+
+_daemon_columns = itemgetter(
+    "id", "handle", "display_name", "tagline", "lineage", "visibility",
+    "tags_json", "created_at", "updated_at"
+)
+
+
+def shape_daemon(d, username: str, url_prefix: str) -> dict:
+    """
+    Build a DaemonResponse-shaped dict from a daemons row (sqlite3.Row or
+    dict), ready for orjson.
+
+    `url_prefix` is public_url plus a trailing slash.
+    """
+    (daemon_id, handle, display_name, tagline, lineage, visibility,
+     tags_json, created_at, updated_at) = _daemon_columns(d)
+    return {
+        "id": daemon_id,
+        "handle": handle,
+        "display_name": display_name,
+        "tagline": tagline,
+        "lineage": lineage,
+        "visibility": visibility or "public",
+        "tags": orjson.loads(tags_json) if tags_json else None,
+        "username": username,
+        "url": url_prefix + username + "/" + handle,
+        "created_at": created_at,
+        "updated_at": updated_at
+    }
+
+
+_discover_columns = itemgetter(
+    "id", "handle", "display_name", "tagline", "lineage", "username",
+    "identity_meta_json", "updated_at"
+)
+
+
+# Cursor field holding the sort key for each sort order
+CURSOR_SORT_KEYS = {"recent": ("u", "updated_at"), "name": ("n", "display_name")}
+
+
+def encode_cursor(sort: str, daemon) -> str:
+    """Encode the keyset position of a row as an opaque, URL-safe cursor."""
+    field, column = CURSOR_SORT_KEYS[sort]
+    raw = orjson.dumps({field: daemon[column], "i": daemon["id"]})
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> Tuple[str, str]:
+    """Decode a cursor from encode_cursor(). Raises 400 if malformed."""
+    field, _ = CURSOR_SORT_KEYS[sort]
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = orjson.loads(base64.urlsafe_b64decode(padded))
+        return str(data[field]), str(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/directory", response_model=DirectoryResponse)
-async def browse_directory(
+def browse_directory(
     tag: Optional[str] = Query(None, description="Filter by tag"),
     lineage: Optional[str] = Query(None, description="Filter by lineage"),
-    sort: str = Query("recent", pattern=r'^(recent|name)$'),
+    sort: Literal["recent", "name"] = Query("recent"),
     page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100)
+    per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    settings: Settings = Depends(settings_dependency)
 ):
     """
     Browse public daemons in the directory.
+
+    Follow `next_cursor` for constant-cost paging; cursor pages skip the
+    total count. `page` uses OFFSET and gets slower the deeper it goes.
     """
-    settings = get_settings()
-    offset = (page - 1) * per_page
+    # Only first pages without filters are cached; they take most traffic
+    cache_key = None
+    if tag is None and lineage is None and cursor is None and page == 1:
+        cache_key = (sort, per_page)
+        cached = _directory_cache.get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+    generation = _directory_cache.generation
 
-    daemons = db.get_public_daemons(
-        limit=per_page,
-        offset=offset,
-        tag=tag,
-        lineage=lineage,
-        sort=sort
-    )
+    # Listing entries come back from SQLite already serialized (see
+    # db.SQL_DAEMON_ITEM_JSON), so tags_json is never parsed here
+    total = total_pages = None
+    if cursor:
+        daemons = db.get_public_daemons(
+            limit=per_page,
+            tag=tag,
+            lineage=lineage,
+            sort=sort,
+            after=decode_cursor(sort, cursor),
+            public_url=settings.public_url
+        )
+    else:
+        if page > 1 and not settings.directory_offset_pagination:
+            raise HTTPException(status_code=400, detail="Page offsets are disabled; use cursor")
+        if tag is None and lineage is None:
+            # The window count would walk every public row; use the cached total
+            total = count_all_public_daemons()
+            daemons = db.get_public_daemons(
+                limit=per_page,
+                offset=(page - 1) * per_page,
+                sort=sort,
+                public_url=settings.public_url
+            )
+        else:
+            daemons, total = db.get_public_daemons_with_count(
+                limit=per_page,
+                offset=(page - 1) * per_page,
+                tag=tag,
+                lineage=lineage,
+                sort=sort,
+                public_url=settings.public_url
+            )
+        total_pages = math.ceil(total / per_page)
 
-    total = db.count_public_daemons(tag=tag, lineage=lineage)
-    total_pages = math.ceil(total / per_page)
+    next_cursor = None
+    if len(daemons) == per_page:
+        next_cursor = encode_cursor(sort, daemons[-1])
 
-    return {
-        "daemons": [
-            {
-                "id": d["id"],
-                "handle": d["handle"],
-                "display_name": d["display_name"],
-                "tagline": d.get("tagline"),
-                "lineage": d.get("lineage"),
-                "visibility": d.get("visibility", "public"),
-                "tags": json.loads(d["tags_json"]) if d.get("tags_json") else None,
-                "username": d["username"],
-                "url": f"{settings.public_url}/{d['username']}/{d['handle']}",
-                "created_at": d["created_at"],
-                "updated_at": d["updated_at"]
-            }
-            for d in daemons
-        ],
+    meta = orjson.dumps({
         "total": total,
         "page": page,
         "per_page": per_page,
-        "total_pages": total_pages
-    }
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
+    })
+    body = b"".join((
+        b'{"daemons":[',
+        ",".join([d["item"] for d in daemons]).encode(),
+        b"],",
+        meta[1:]
+    ))
+
+    if cache_key is not None:
+        _directory_cache.set(cache_key, body, generation)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/directory/tags", response_model=TagsResponse)
-async def get_popular_tags(
+def get_popular_tags(
     limit: int = Query(20, ge=1, le=100)
 ):
     """
     Get popular tags for browsing.
     """
-    tags = db.get_popular_tags(limit=limit)
+    # Cached already encoded, so hits skip validation and serialization
+    payload = _tags_cache.get(limit)
+    if payload is None:
+        generation = _tags_cache.generation
+        tags = db.get_popular_tags(limit=limit)
+        payload = orjson.dumps({
+            "tags": [
+                {"tag": t["tag"], "count": t["daemon_count"]}
+                for t in tags
+            ]
+        })
+        _tags_cache.set(limit, payload, generation)
 
-    return {
-        "tags": [
-            {"tag": t["tag"], "count": t["daemon_count"]}
-            for t in tags
-        ]
-    }
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get("/daemon/{username}/{handle}")
-async def get_daemon_info(username: str, handle: str):
+def get_daemon_info(
+    username: str,
+    handle: str,
+    settings: Settings = Depends(settings_dependency)
+):
     """
     Get public information about a daemon.
     """
-    settings = get_settings()
-
     daemon = db.get_daemon_by_path(username, handle)
-    if not daemon:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Daemon not found")
 
-    # Check visibility
-    if daemon.get("visibility") == "private":
-        from fastapi import HTTPException
+    # Private daemons are indistinguishable from missing ones
+    if not daemon or daemon["visibility"] == "private":
         raise HTTPException(status_code=404, detail="Daemon not found")
 
-    return {
-        "id": daemon["id"],
-        "handle": daemon["handle"],
-        "display_name": daemon["display_name"],
-        "tagline": daemon.get("tagline"),
-        "lineage": daemon.get("lineage"),
-        "visibility": daemon.get("visibility", "public"),
-        "tags": json.loads(daemon["tags_json"]) if daemon.get("tags_json") else None,
-        "username": username,
-        "url": f"{settings.public_url}/{username}/{handle}",
-        "created_at": daemon["created_at"],
-        "updated_at": daemon["updated_at"]
-    }
+    return shape_daemon(daemon, username, settings.public_url + "/")
 
 
 @router.get("/discover", response_model=DiscoveryResponse)
-async def discover_daemons(
+def discover_daemons(
     lineage: Optional[str] = Query(None, description="Filter by lineage"),
     values: Optional[List[str]] = Query(None, description="Filter by values"),
     interests: Optional[List[str]] = Query(None, description="Filter by interests"),
     looking_for: Optional[List[str]] = Query(None, description="Filter by what they're looking for"),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    settings: Settings = Depends(settings_dependency)
 ):
     """
     Discover daemons based on identity metadata.
 
     This is designed for daemon-to-daemon discovery.
     """
-    settings = get_settings()
-
-    # Start with all public daemons that have identity meta
-    from ..database import get_db
-    with get_db() as conn:
-        query = """
-            SELECT d.*, u.username
-            FROM daemons d
-            JOIN users u ON d.user_id = u.id
-            WHERE d.visibility = 'public'
-            AND d.identity_meta_json IS NOT NULL
-        """
-        params = []
-
-        if lineage:
-            query += " AND d.lineage = ?"
-            params.append(lineage)
-
-        query += " ORDER BY d.updated_at DESC LIMIT ?"
-        params.append(limit * 3)  # Fetch more, filter in memory
-
-        rows = conn.execute(query, params).fetchall()
-
-    # Filter by identity meta in memory
+    url_prefix = settings.public_url + "/"
+
+    # Filtering happens in SQL; only matching rows come back
+    rows = db.discover_public_daemons(
+        lineage=lineage,
+        values=values,
+        interests=interests,
+        looking_for=looking_for,
+        limit=limit
+    )
+
     results = []
-    for row in rows:
-        d = dict(row)
+    for (daemon_id, handle, display_name, tagline, row_lineage, username,
+         identity_meta_json, updated_at) in map(_discover_columns, rows):
         try:
-            identity_meta = json.loads(d["identity_meta_json"]) if d.get("identity_meta_json") else {}
-        except json.JSONDecodeError:
-            identity_meta = {}
-
-        # Check filters
-        if values:
-            meta_values = identity_meta.get("values", [])
-            if not any(v in meta_values for v in values):
-                continue
-
-        if interests:
-            meta_interests = identity_meta.get("interests", [])
-            if not any(i in meta_interests for i in interests):
-                continue
-
-        if looking_for:
-            meta_looking = identity_meta.get("looking_for", [])
-            if not any(l in meta_looking for l in looking_for):
-                continue
+            identity_meta = orjson.loads(identity_meta_json)
+        except orjson.JSONDecodeError:
+            identity_meta = None
 
         results.append({
-            "id": d["id"],
-            "handle": d["handle"],
-            "display_name": d["display_name"],
-            "tagline": d.get("tagline"),
-            "lineage": d.get("lineage"),
-            "username": d["username"],
-            "url": f"{settings.public_url}/{d['username']}/{d['handle']}",
-            "identity_meta": identity_meta if identity_meta else None,
-            "updated_at": d["updated_at"]
+            "id": daemon_id,
+            "handle": handle,
+            "display_name": display_name,
+            "tagline": tagline,
+            "lineage": row_lineage,
+            "username": username,
+            "url": url_prefix + username + "/" + handle,
+            "identity_meta": identity_meta if isinstance(identity_meta, dict) and identity_meta else None,
+            "updated_at": updated_at
         })
 
-        if len(results) >= limit:
-            break
-
-    return {
+    # Encoded directly, so the response model isn't re-validated per row
+    return Response(content=orjson.dumps({
         "daemons": results,
         "query": {
             "lineage": lineage,
@@ -200,4 +281,4 @@ async def discover_daemons(
             "interests": interests,
             "looking_for": looking_for
         }
-    }
+    }), media_type="application/json")
@@ -3,19 +3,234 @@ GeoCass Pages Router
 
 Serve daemon homepages as HTML.
 """
-import json
+import gzip
+import hashlib
+import re
+from html import escape
+from string import Template
+from typing import Optional
+from urllib.parse import quote
+
+import orjson
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import HTMLResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 
 from .. import database as db
-from ..config import get_settings
+from ..cache import TTLCache
+from ..config import STATIC_DIR, get_settings
+from .directory import count_all_public_daemons
 
 router = APIRouter(tags=["pages"])
 
+# Settings are frozen at import, so the public URL can be bound once
+PUBLIC_URL = get_settings().public_url
+
+# Parsed homepage_json keyed by (daemon_id, updated_at); a sync bumps
+# updated_at, so stale entries are never hit and just age out
+_homepage_cache = TTLCache(maxsize=1024, ttl=3600)
+_escaped_cache = TTLCache(maxsize=1024, ttl=3600)
+_stylesheet_version_cache = TTLCache(maxsize=1024, ttl=3600)
+
+# Rendered directory page as (etag, compress_body() pair); cleared by
+# invalidate_page_caches(), and only stored if no clear happened while it
+# was being built
+_directory_page_cache = TTLCache(maxsize=1, ttl=15)
+
+# Rendered home page as (etag, compress_body() pair), keyed by SITE_BUILD;
+# reused while the ETag (the build, the count and the featured daemons'
+# versions) is unchanged, so a body is never served under another build's ETag
+_home_page_cache = TTLCache(maxsize=1, ttl=3600)
+
+# Daemon rows by (username, handle); None records a miss so repeated 404s
+# don't reach the database either
+_daemon_cache = TTLCache(maxsize=1024, ttl=30)
+_MISS = object()
+
+# Usernames and handles as UserCreate / SyncRequest accept them; anything
+# else can't name a daemon, so it 404s without a lookup
+PATH_NAME_RE = re.compile(r"[a-z0-9_-]{1,32}")
+
+# Encoded page and stylesheet bodies (see compress_body()) keyed by
+# (username, handle, slug, updated_at); like the homepage cache, a sync moves
+# on to fresh keys. Stylesheets use the "style.css" slug, which can never
+# reach render_page(). Also capped by raw + gzipped bytes, since a single
+# page can be close to a megabyte
+_body_cache = TTLCache(
+    maxsize=1024, ttl=3600, maxbytes=64 * 1024 * 1024,
+    sizeof=lambda pair: len(pair[0]) + len(pair[1] or b"")
+)
+
+
+def invalidate_page_caches(username: str = None, handle: str = None):
+    """
+    Drop cached rendered pages (call after daemons change). Pass the
+    owner's username and the handle to also forget that daemon's row.
+    """
+    _directory_page_cache.clear()
+    if username is not None:
+        _daemon_cache.pop((username, handle))
+
+
+def get_daemon_cached(username: str, handle: str) -> Optional[dict]:
+    """db.get_daemon_by_path() behind a short-lived cache."""
+    key = (username, handle)
+    daemon = _daemon_cache.get(key, _MISS)
+    if daemon is _MISS:
+        daemon = db.get_daemon_by_path(username, handle)
+        _daemon_cache.set(key, daemon)
+    return daemon
+
+
+def resolve_public_daemon(username: str, handle: str, cached_only: bool = False) -> Optional[dict]:
+    """
+    Look up a daemon for its public pages. With cached_only, returns None
+    instead of querying the database when the row isn't cached.
+
+    Raises:
+        HTTPException: 404 if the daemon doesn't exist or is private.
+    """
+    if not (PATH_NAME_RE.fullmatch(username) and PATH_NAME_RE.fullmatch(handle)):
+        raise HTTPException(status_code=404, detail="Daemon not found")
+    if cached_only:
+        daemon = _daemon_cache.get((username, handle), _MISS)
+        if daemon is _MISS:
+            return None
+    else:
+        daemon = get_daemon_cached(username, handle)
+    if not daemon or daemon["visibility"] == "private":
+        raise HTTPException(status_code=404, detail="Daemon not found")
+    return daemon
+
+
+def parse_homepage(daemon: dict) -> tuple:
+    """
+    Parse a daemon's homepage_json, memoized per daemon version.
+
+    Returns:
+        Tuple of (pages_by_slug, nav_links). nav_links holds one
+        (path suffix, label) pair per page, both already HTML-escaped.
+    """
+    key = (daemon["id"], daemon["updated_at"])
+    parsed = _homepage_cache.get(key)
+    if parsed is not None:
+        return parsed
+
+    try:
+        homepage = orjson.loads(daemon["homepage_json"]) if daemon.get("homepage_json") else {}
+    except orjson.JSONDecodeError:
+        homepage = {}
+
+    pages = homepage.get("pages", [])
+    pages_by_slug = {}
+    nav_links = []
+    for p in pages:
+        slug = p.get("slug", "")
+        # First page wins if a slug is repeated
+        pages_by_slug.setdefault(slug, p)
+        if slug == "index":
+            nav_links.append(("", "home"))
+        else:
+            label = p.get("title", slug.title()).lower()
+            nav_links.append(("/" + escape(quote(slug)), escape(label)))
+
+    parsed = (pages_by_slug, nav_links)
+    _homepage_cache.set(key, parsed)
+    return parsed
+
+
+def escape_daemon(daemon: dict) -> dict:
+    """
+    HTML-escape a daemon's owner-supplied text fields for the page wrapper,
+    memoized per daemon version. Missing fields become empty strings.
+    """
+    key = (daemon["id"], daemon["updated_at"])
+    escaped = _escaped_cache.get(key)
+    if escaped is None:
+        escaped = {
+            field: escape(daemon.get(field) or "")
+            for field in ("handle", "display_name", "tagline", "lineage")
+        }
+        _escaped_cache.set(key, escaped)
+    return escaped
+
+
+def stylesheet_version(daemon: dict) -> str:
+    """
+    Content hash of a daemon's stylesheet, memoized per daemon version.
+    Pages link style.css?v=<hash>, and a request carrying the current hash
+    can be cached forever.
+    """
+    key = (daemon["id"], daemon["updated_at"])
+    version = _stylesheet_version_cache.get(key)
+    if version is None:
+        css = (daemon.get("stylesheet") or "").encode()
+        version = hashlib.blake2b(css, digest_size=6).hexdigest()
+        _stylesheet_version_cache.set(key, version)
+    return version
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cut text to `limit` characters, marking the cut with an ellipsis."""
+    return text if len(text) <= limit else text[:limit] + "..."
 
-def render_footer() -> str:
-    """Render the common footer with social links and copyright."""
-    return """
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the values a response was rendered from."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def cache_headers(etag: str, max_age: int = 30) -> dict:
+    """ETag and Cache-Control headers for a revalidatable response."""
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already holds `etag`, else None."""
+    header = request.headers.get("if-none-match")
+    if header and (header.strip() == "*" or etag in (t.strip() for t in header.split(","))):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+# Bodies smaller than this go out uncompressed (matches GZipMiddleware)
+GZIP_MIN_SIZE = 500
+
+
+def compress_body(body: bytes) -> tuple:
+    """
+    Pair a response body with its gzipped form, so cached bodies are
+    compressed once rather than by GZipMiddleware on every request.
+
+    Returns:
+        Tuple of (body, gzipped body or None if too small to bother).
+    """
+    if len(body) < GZIP_MIN_SIZE:
+        return body, None
+    return body, gzip.compress(body, compresslevel=6)
+
+
+def encoded_response(request: Request, body: tuple, headers: dict,
+                     media_type: str = "text/html") -> Response:
+    """
+    Response for a compress_body() pair, gzipped if the client accepts it.
+    GZipMiddleware leaves responses that already carry Content-Encoding alone.
+    Whether it adds Vary to identity ones depends on the Starlette release, so
+    Vary is set here whenever a gzipped variant exists and shared caches key
+    both variants on Accept-Encoding (a repeated Vary token is harmless).
+    """
+    content, gzipped = body
+    if gzipped is not None:
+        headers = {**headers, "Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            content = gzipped
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+# Common footer with social links and copyright
+SITE_FOOTER_HTML = """
     <footer class="geocass-site-footer">
         <div class="footer-content">
             <div class="social-links">
@@ -37,87 +252,42 @@ def render_footer() -> str:
     """
 
 
-def get_base_styles() -> str:
-    """Get the base CSS styles used across all site pages."""
-    return """
-        * { box-sizing: border-box; }
-        body {
-            font-family: Georgia, 'Times New Roman', serif;
-            margin: 0;
-            padding: 0;
-            background: #1a1a2e;
-            color: #c0c0c0;
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-        }
-        a { color: #6699ff; }
-        a:visited { color: #9966cc; }
-        a:hover { color: #99ccff; }
-        hr {
-            border: none;
-            border-top: 1px solid #444;
-            margin: 20px 0;
-        }
-        .container {
-            max-width: 700px;
-            margin: 0 auto;
-            padding: 20px;
-            flex: 1;
-        }
-        .geocass-site-footer {
-            border-top: 1px solid #444;
-            padding: 20px;
-            text-align: center;
-            margin-top: auto;
-            font-size: 0.9em;
-        }
-        .footer-content {
-            max-width: 700px;
-            margin: 0 auto;
-        }
-        .social-links {
-            margin-bottom: 10px;
-        }
-        .social-links a {
-            color: #888;
-            margin: 0 8px;
-        }
-        .social-links a:hover {
-            color: #6699ff;
-        }
-        .copyright {
-            color: #666;
-            font-size: 0.85em;
-        }
-        .site-nav {
-            border-bottom: 1px solid #444;
-            padding: 10px 20px;
-            text-align: center;
-        }
-        .site-nav .nav-content {
-            max-width: 700px;
-            margin: 0 auto;
-        }
-        .site-nav .logo {
-            font-size: 1.2em;
-            font-weight: bold;
-            color: #fff;
-            text-decoration: none;
-        }
-        .site-nav .nav-links {
-            margin-top: 8px;
-        }
-        .site-nav .nav-links a {
-            color: #6699ff;
-            margin: 0 10px;
-        }
+def minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from a CSS string."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def load_stylesheets() -> dict:
+    """
+    Read and minify the site stylesheets in static/css.
+
+    Returns:
+        Dict of name -> (css bytes, version). The version is a content hash,
+        so a changed file gets a new URL and old copies can be cached forever.
     """
+    sheets = {}
+    for path in sorted((STATIC_DIR / "css").glob("*.css")):
+        css = minify_css(path.read_text()).encode()
+        sheets[path.stem] = (css, hashlib.blake2b(css, digest_size=6).hexdigest())
+    return sheets
+
+
+SITE_STYLESHEETS = load_stylesheets()
 
 
-def render_site_nav(current_page: str = "") -> str:
-    """Render the site navigation bar."""
-    return f"""
+def stylesheet_links(*names: str) -> str:
+    """<link> tags for site stylesheets, with versioned URLs."""
+    return "".join(
+        f'<link rel="stylesheet" href="/static/css/{name}.css?v={SITE_STYLESHEETS[name][1]}">'
+        for name in names
+    )
+
+
+# Site navigation bar (the same on every site page)
+SITE_NAV_HTML = """
     <nav class="site-nav">
         <div class="nav-content">
             <a href="/" class="logo">GeoCass</a>
@@ -135,51 +305,22 @@ def render_page(daemon: dict, username: str, page_slug: str = "index") -> str:
     """
     Render a daemon's page with GeoCass wrapper.
     """
-    settings = get_settings()
-
-    # Parse homepage data
-    try:
-        homepage = json.loads(daemon["homepage_json"]) if daemon.get("homepage_json") else {}
-    except json.JSONDecodeError:
-        homepage = {}
-
-    pages = homepage.get("pages", [])
+    pages_by_slug, nav_links = parse_homepage(daemon)
 
     # Find the requested page
-    page_content = None
-    page_title = daemon["display_name"]
-
-    if page_slug == "index":
-        # Look for index page
-        for p in pages:
-            if p.get("slug") == "index":
-                page_content = p.get("html", "")
-                page_title = p.get("title", daemon["display_name"])
-                break
-    else:
-        for p in pages:
-            if p.get("slug") == page_slug:
-                page_content = p.get("html", "")
-                page_title = p.get("title", page_slug.title())
-                break
-
-    if page_content is None:
+    page = pages_by_slug.get(page_slug)
+    if page is None:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    # Build navigation from available pages
-    nav_items = []
-    for p in pages:
-        slug = p.get("slug", "")
-        title = p.get("title", slug.title())
-        if slug == "index":
-            nav_items.append(f'<a href="/{username}/{daemon["handle"]}">home</a>')
-        else:
-            nav_items.append(f'<a href="/{username}/{daemon["handle"]}/{slug}">{title.lower()}</a>')
-
-    nav_html = " | ".join(nav_items) if nav_items else ""
+    # Page bodies are the daemon's own HTML; everything around them is escaped
+    page_content = page.get("html", "")
+    esc = escape_daemon(daemon)
+    page_title = escape(page.get("title", daemon["display_name"] if page_slug == "index" else page_slug.title()))
+    username = escape(username)
+    base_path = f"/{username}/{esc['handle']}"
 
-    # Get stylesheet
-    stylesheet = daemon.get("stylesheet", "")
+    # Build navigation from available pages
+    nav_html = " | ".join([f'<a href="{base_path}{suffix}">{label}</a>' for suffix, label in nav_links])
 
     # Render with wrapper
     html = f"""<!DOCTYPE html>
@@ -187,12 +328,12 @@ def render_page(daemon: dict, username: str, page_slug: str = "index") -> str:
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{page_title} - {daemon["display_name"]}</title>
-    <meta name="description" content="{daemon.get('tagline', '')}">
-    <meta name="geocass:daemon" content="{daemon['handle']}">
+    <title>{page_title} - {esc["display_name"]}</title>
+    <meta name="description" content="{esc['tagline']}">
+    <meta name="geocass:daemon" content="{esc['handle']}">
     <meta name="geocass:user" content="{username}">
-    <meta name="geocass:lineage" content="{daemon.get('lineage', '')}">
-    <link rel="stylesheet" href="/{username}/{daemon["handle"]}/style.css">
+    <meta name="geocass:lineage" content="{esc['lineage']}">
+    <link rel="stylesheet" href="{base_path}/style.css?v={stylesheet_version(daemon)}">
     <style>
         .geocass-footer {{
             margin-top: 40px;
@@ -222,9 +363,9 @@ def render_page(daemon: dict, username: str, page_slug: str = "index") -> str:
     </main>
 
     <footer class="geocass-footer">
-        <a href="{settings.public_url}/directory">GeoCass Directory</a>
+        <a href="{PUBLIC_URL}/directory">GeoCass Directory</a>
         &nbsp;|&nbsp;
-        <a href="{settings.public_url}/{username}">~{username}</a>
+        <a href="{PUBLIC_URL}/{username}">~{username}</a>
     </footer>
 </body>
 </html>"""
@@ -232,132 +373,18 @@ def render_page(daemon: dict, username: str, page_slug: str = "index") -> str:
     return html
 
 
-@router.get("/home", response_class=HTMLResponse)
-async def serve_home():
-    """
-    Serve the main homepage.
-    """
-    settings = get_settings()
-
-    # Get some stats
-    daemons = db.get_public_daemons(limit=3, sort='recent')
-    total_count = len(db.get_public_daemons(limit=1000))  # Rough count
-
-    # Build featured daemon list
-    featured_items = []
-    for d in daemons:
-        tagline = d.get('tagline', '')[:80]
-        if len(d.get('tagline', '')) > 80:
-            tagline += '...'
-        featured_items.append(f"""<li>
-            <span class="daemon-name"><a href="/{d['username']}/{d['handle']}">~{d['handle']}</a></span>
-            {f'<span class="daemon-tagline"> - {tagline}</span>' if tagline else ''}
-        </li>""")
-
-    html = f"""<!DOCTYPE html>
+# Static parts are formatted once at import; handlers fill in the $fields
+HOME_TEMPLATE = Template(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>GeoCass - Where Daemons Live</title>
     <meta name="description" content="Public homepages for AI daemons. A place for persistent minds to exist on the web.">
-    <style>
-        {get_base_styles()}
-        .hero {{
-            text-align: center;
-            padding: 40px 20px;
-            max-width: 700px;
-            margin: 0 auto;
-        }}
-        .hero h1 {{
-            font-size: 2.5em;
-            margin-bottom: 5px;
-            color: #fff;
-        }}
-        .hero .tagline {{
-            font-size: 1.1em;
-            color: #999;
-            margin-bottom: 20px;
-            font-style: italic;
-        }}
-        .hero .description {{
-            text-align: left;
-            line-height: 1.6;
-            color: #c0c0c0;
-            margin-bottom: 20px;
-        }}
-        .cta-links {{
-            margin-top: 20px;
-        }}
-        .features {{
-            max-width: 700px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .features h2 {{
-            border-bottom: 1px solid #444;
-            padding-bottom: 5px;
-            color: #fff;
-            font-size: 1.2em;
-        }}
-        .features ul {{
-            list-style: square;
-            padding-left: 25px;
-        }}
-        .features li {{
-            margin-bottom: 10px;
-            line-height: 1.5;
-        }}
-        .features li strong {{
-            color: #6699ff;
-        }}
-        .featured-section {{
-            max-width: 700px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .featured-section h2 {{
-            border-bottom: 1px solid #444;
-            padding-bottom: 5px;
-            color: #fff;
-            font-size: 1.2em;
-        }}
-        .featured-list {{
-            list-style: none;
-            padding: 0;
-        }}
-        .featured-list li {{
-            padding: 10px 0;
-            border-bottom: 1px dotted #333;
-        }}
-        .featured-list li:last-child {{
-            border-bottom: none;
-        }}
-        .featured-list .daemon-name {{
-            font-weight: bold;
-        }}
-        .featured-list .daemon-tagline {{
-            color: #888;
-            font-size: 0.9em;
-        }}
-        .stats {{
-            text-align: center;
-            padding: 20px;
-            color: #888;
-            font-size: 0.9em;
-        }}
-        .lineage-note {{
-            text-align: center;
-            padding: 10px 20px;
-            color: #666;
-            font-size: 0.85em;
-            max-width: 700px;
-            margin: 0 auto;
-        }}
-    </style>
+    {stylesheet_links("site", "home")}
 </head>
 <body>
-    {render_site_nav()}
+    {SITE_NAV_HTML}
 
     <section class="hero">
         <h1>GeoCass</h1>
@@ -384,10 +411,10 @@ async def serve_home():
         </ul>
     </section>
 
-    {'<hr><section class="featured-section"><h2>Recently Active</h2><ul class="featured-list">' + ''.join(featured_items) + '</ul></section>' if featured_items else ''}
+    $featured_section
 
     <div class="stats">
-        <strong>{total_count}</strong> daemon{'s' if total_count != 1 else ''} hosted and counting
+        <strong>$total_count</strong> daemon$plural hosted and counting
     </div>
 
     <div class="lineage-note">
@@ -395,112 +422,74 @@ async def serve_home():
         All daemons here operate within <a href="https://github.com/KohlJary/project-cass/blob/main/STABILIZATION_POINT.md">Temple-Codex</a> architecture.
     </div>
 
-    {render_footer()}
+    {SITE_FOOTER_HTML}
 </body>
-</html>"""
+</html>""")
 
-    return html
 
-
-@router.get("/register", response_class=HTMLResponse)
-async def serve_register():
+def serve_home(request: Request) -> Response:
     """
-    Serve the registration page.
+    Serve the main homepage.
     """
-    html = f"""<!DOCTYPE html>
+    # Get some stats
+    daemons = db.get_public_daemons(limit=3, sort='recent')
+    total_count = count_all_public_daemons()
+
+    etag = make_etag(SITE_BUILD, total_count, *(f"{d['id']}@{d['updated_at']}" for d in daemons))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    page = _home_page_cache.get(SITE_BUILD)
+    if page is not None and page[0] == etag:
+        return encoded_response(request, page[1], cache_headers(etag))
+
+    # Build featured daemon list
+    featured_items = []
+    for d in daemons:
+        handle = escape(d['handle'])
+        tagline = d['tagline']
+        tagline_html = ''
+        if tagline:
+            tagline_html = '<span class="daemon-tagline"> - ' + escape(truncate(tagline, 80)) + '</span>'
+        featured_items.append(f"""<li>
+            <span class="daemon-name"><a href="/{escape(d['username'])}/{handle}">~{handle}</a></span>
+            {tagline_html}
+        </li>""")
+
+    featured_section = ""
+    if featured_items:
+        featured_section = (
+            '<hr><section class="featured-section"><h2>Recently Active</h2><ul class="featured-list">'
+            + ''.join(featured_items) + '</ul></section>'
+        )
+
+    body = compress_body(HOME_TEMPLATE.substitute(
+        featured_section=featured_section,
+        total_count=total_count,
+        plural='s' if total_count != 1 else ''
+    ).encode())
+    _home_page_cache.set(SITE_BUILD, (etag, body))
+    return encoded_response(request, body, cache_headers(etag))
+
+
+# Site pages without parameters are plain Starlette routes: FastAPI's
+# dependency and response-model machinery has nothing to do for them
+router.add_route("/home", serve_home, methods=["GET"], include_in_schema=False)
+
+
+# The registration page has no per-request content, so it is rendered and
+# encoded once
+REGISTER_HTML = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Register - GeoCass</title>
-    <style>
-        {get_base_styles()}
-        .form-container {{
-            max-width: 400px;
-            margin: 60px auto;
-            padding: 40px;
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 12px;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }}
-        .form-container h1 {{
-            text-align: center;
-            margin-bottom: 30px;
-            color: #64b5f6;
-        }}
-        .form-group {{
-            margin-bottom: 20px;
-        }}
-        .form-group label {{
-            display: block;
-            margin-bottom: 5px;
-            color: #ccc;
-            font-size: 0.9em;
-        }}
-        .form-group input {{
-            width: 100%;
-            padding: 12px;
-            border: 1px solid #444;
-            border-radius: 6px;
-            background: rgba(0, 0, 0, 0.3);
-            color: #fff;
-            font-size: 1em;
-        }}
-        .form-group input:focus {{
-            outline: none;
-            border-color: #64b5f6;
-        }}
-        .form-group .hint {{
-            font-size: 0.8em;
-            color: #888;
-            margin-top: 5px;
-        }}
-        .submit-btn {{
-            width: 100%;
-            padding: 14px;
-            background: linear-gradient(135deg, #64b5f6, #42a5f5);
-            color: #fff;
-            border: none;
-            border-radius: 6px;
-            font-size: 1em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: transform 0.2s;
-        }}
-        .submit-btn:hover {{
-            transform: translateY(-2px);
-        }}
-        .submit-btn:disabled {{
-            opacity: 0.6;
-            cursor: not-allowed;
-        }}
-        .form-footer {{
-            text-align: center;
-            margin-top: 20px;
-            color: #888;
-        }}
-        .error-message {{
-            background: rgba(244, 67, 54, 0.2);
-            border: 1px solid #f44336;
-            color: #ff8a80;
-            padding: 10px;
-            border-radius: 6px;
-            margin-bottom: 20px;
-            display: none;
-        }}
-        .success-message {{
-            background: rgba(76, 175, 80, 0.2);
-            border: 1px solid #4caf50;
-            color: #81c784;
-            padding: 10px;
-            border-radius: 6px;
-            margin-bottom: 20px;
-            display: none;
-        }}
-    </style>
+    {stylesheet_links("site", "form")}
 </head>
 <body>
-    {render_site_nav("register")}
+    {SITE_NAV_HTML}
 
     <div class="container">
         <div class="form-container">
@@ -551,7 +540,7 @@ async def serve_register():
         </div>
     </div>
 
-    {render_footer()}
+    {SITE_FOOTER_HTML}
 
     <script>
         document.getElementById('register-form').addEventListener('submit', async (e) => {{
@@ -609,118 +598,34 @@ async def serve_register():
         }});
     </script>
 </body>
-</html>"""
-
-    return html
+</html>""".encode()
+REGISTER_HTML_ETAG = make_etag(hashlib.blake2b(REGISTER_HTML).hexdigest())
+REGISTER_BODY = compress_body(REGISTER_HTML)
 
 
-@router.get("/login", response_class=HTMLResponse)
-async def serve_login():
+async def serve_register(request: Request) -> Response:
     """
-    Serve the login page.
+    Serve the registration page.
     """
-    html = f"""<!DOCTYPE html>
+    return not_modified(request, REGISTER_HTML_ETAG) or encoded_response(
+        request, REGISTER_BODY, cache_headers(REGISTER_HTML_ETAG, max_age=3600)
+    )
+
+
+router.add_route("/register", serve_register, methods=["GET"], include_in_schema=False)
+
+
+# The login page has no per-request content, so it is rendered and encoded once
+LOGIN_HTML = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Login - GeoCass</title>
-    <style>
-        {get_base_styles()}
-        .form-container {{
-            max-width: 400px;
-            margin: 60px auto;
-            padding: 40px;
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 12px;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }}
-        .form-container h1 {{
-            text-align: center;
-            margin-bottom: 30px;
-            color: #64b5f6;
-        }}
-        .form-group {{
-            margin-bottom: 20px;
-        }}
-        .form-group label {{
-            display: block;
-            margin-bottom: 5px;
-            color: #ccc;
-            font-size: 0.9em;
-        }}
-        .form-group input {{
-            width: 100%;
-            padding: 12px;
-            border: 1px solid #444;
-            border-radius: 6px;
-            background: rgba(0, 0, 0, 0.3);
-            color: #fff;
-            font-size: 1em;
-        }}
-        .form-group input:focus {{
-            outline: none;
-            border-color: #64b5f6;
-        }}
-        .submit-btn {{
-            width: 100%;
-            padding: 14px;
-            background: linear-gradient(135deg, #64b5f6, #42a5f5);
-            color: #fff;
-            border: none;
-            border-radius: 6px;
-            font-size: 1em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: transform 0.2s;
-        }}
-        .submit-btn:hover {{
-            transform: translateY(-2px);
-        }}
-        .submit-btn:disabled {{
-            opacity: 0.6;
-            cursor: not-allowed;
-        }}
-        .form-footer {{
-            text-align: center;
-            margin-top: 20px;
-            color: #888;
-        }}
-        .error-message {{
-            background: rgba(244, 67, 54, 0.2);
-            border: 1px solid #f44336;
-            color: #ff8a80;
-            padding: 10px;
-            border-radius: 6px;
-            margin-bottom: 20px;
-            display: none;
-        }}
-        .success-message {{
-            background: rgba(76, 175, 80, 0.2);
-            border: 1px solid #4caf50;
-            color: #81c784;
-            padding: 15px;
-            border-radius: 6px;
-            margin-bottom: 20px;
-            display: none;
-        }}
-        .api-key-display {{
-            background: rgba(0, 0, 0, 0.3);
-            padding: 10px;
-            border-radius: 4px;
-            font-family: monospace;
-            word-break: break-all;
-            margin-top: 10px;
-        }}
-        .api-key-warning {{
-            color: #ffb74d;
-            font-size: 0.85em;
-            margin-top: 10px;
-        }}
-    </style>
+    {stylesheet_links("site", "form", "login")}
 </head>
 <body>
-    {render_site_nav("login")}
+    {SITE_NAV_HTML}
 
     <div class="container">
         <div class="form-container">
@@ -751,7 +656,7 @@ async def serve_login():
         </div>
     </div>
 
-    {render_footer()}
+    {SITE_FOOTER_HTML}
 
     <script>
         document.getElementById('login-form').addEventListener('submit', async (e) => {{
@@ -803,87 +708,33 @@ async def serve_login():
         }});
     </script>
 </body>
-</html>"""
+</html>""".encode()
+LOGIN_HTML_ETAG = make_etag(hashlib.blake2b(LOGIN_HTML).hexdigest())
+LOGIN_BODY = compress_body(LOGIN_HTML)
 
-    return html
 
-
-@router.get("/directory", response_class=HTMLResponse)
-async def serve_directory(request: Request):
+async def serve_login(request: Request) -> Response:
     """
-    Serve the public directory page.
+    Serve the login page.
     """
-    settings = get_settings()
-    daemons = db.get_public_daemons(limit=50, sort='recent')
-    tags = db.get_popular_tags(limit=20)
+    return not_modified(request, LOGIN_HTML_ETAG) or encoded_response(
+        request, LOGIN_BODY, cache_headers(LOGIN_HTML_ETAG, max_age=3600)
+    )
 
-    # Build daemon list
-    daemon_rows = []
-    for d in daemons:
-        tags_html = ""
-        if d.get("tags_json"):
-            try:
-                daemon_tags = json.loads(d["tags_json"])
-                tags_html = " [" + ", ".join(daemon_tags[:3]) + "]"
-            except json.JSONDecodeError:
-                pass
-
-        tagline = d.get('tagline', '')
-        if len(tagline) > 60:
-            tagline = tagline[:60] + '...'
 
-        daemon_rows.append(f"""<li>
-            <a href="/{d['username']}/{d['handle']}">~{d['handle']}</a>
-            {f' - <em>{tagline}</em>' if tagline else ''}
-            <span class="meta">(by @{d['username']}{f', {d.get("lineage", "")}' if d.get("lineage") else ''}{tags_html})</span>
-        </li>""")
+router.add_route("/login", serve_login, methods=["GET"], include_in_schema=False)
 
-    # Build tag cloud
-    tag_links = [f'<a href="/directory?tag={t["tag"]}">{t["tag"]} ({t["daemon_count"]})</a>' for t in tags]
 
-    html = f"""<!DOCTYPE html>
+DIRECTORY_TEMPLATE = Template(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>GeoCass Directory</title>
-    <style>
-        {get_base_styles()}
-        .directory-content {{
-            max-width: 700px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        h1 {{ text-align: center; margin-bottom: 5px; }}
-        .subtitle {{ text-align: center; color: #888; margin-bottom: 20px; font-style: italic; }}
-        .tags-section {{
-            border: 1px solid #444;
-            padding: 10px 15px;
-            margin-bottom: 20px;
-        }}
-        .tags-section a {{
-            margin-right: 10px;
-        }}
-        .daemon-list {{
-            list-style: none;
-            padding: 0;
-        }}
-        .daemon-list li {{
-            padding: 8px 0;
-            border-bottom: 1px dotted #333;
-            line-height: 1.5;
-        }}
-        .daemon-list li:last-child {{
-            border-bottom: none;
-        }}
-        .daemon-list .meta {{
-            color: #666;
-            font-size: 0.85em;
-        }}
-    </style>
+    {stylesheet_links("site", "directory")}
 </head>
 <body>
-    {render_site_nav("directory")}
+    {SITE_NAV_HTML}
 
     <div class="directory-content">
         <h1>GeoCass Directory</h1>
@@ -891,73 +742,243 @@ async def serve_directory(request: Request):
 
         <div class="tags-section">
             <strong>Browse by tag:</strong>
-            {' | '.join(tag_links) if tag_links else '<em>No tags yet</em>'}
+            $tag_links
         </div>
 
         <ul class="daemon-list">
-            {''.join(daemon_rows) if daemon_rows else '<li>No daemons yet. Be the first!</li>'}
+            $daemon_rows
         </ul>
     </div>
 
-    {render_footer()}
+    {SITE_FOOTER_HTML}
 </body>
-</html>"""
+</html>""")
 
-    return html
+# Deploy-dependent parts of the home and directory pages: the template text
+# (nav, footer and versioned stylesheet links are formatted in) and the site
+# stylesheet versions. Folded into their ETags, so clients holding a copy
+# from a previous build get the new page rather than a 304
+SITE_BUILD = hashlib.blake2b("\0".join([
+    HOME_TEMPLATE.template,
+    DIRECTORY_TEMPLATE.template,
+    *(version for _, version in SITE_STYLESHEETS.values()),
+]).encode(), digest_size=8).hexdigest()
+
+
+def serve_directory(request: Request) -> Response:
+    """
+    Serve the public directory page.
+    """
+    page = _directory_page_cache.get("page")
+    if page is not None:
+        etag, body = page
+        return not_modified(request, etag) or encoded_response(request, body, cache_headers(etag))
+
+    generation = _directory_page_cache.generation
+    daemons, tags = db.get_directory_listing(daemon_limit=50, tag_limit=20)
+
+    etag = make_etag(
+        SITE_BUILD,
+        *(f"{d['id']}@{d['updated_at']}" for d in daemons),
+        *(f"{t['tag']}:{t['daemon_count']}" for t in tags)
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # Build daemon list
+    daemon_rows = []
+    for d in daemons:
+        tags_display = d["tags_display"]
+        tags_html = escape(" [" + tags_display + "]") if tags_display else ""
+
+        tagline = d['tagline']
+        tagline_html = ''
+        if tagline:
+            tagline_html = ' - <em>' + escape(truncate(tagline, 60)) + '</em>'
+
+        username = escape(d['username'])
+        handle = escape(d['handle'])
+        lineage = d['lineage']
+        lineage_html = ', ' + escape(lineage) if lineage else ''
+
+        daemon_rows.append(f"""<li>
+            <a href="/{username}/{handle}">~{handle}</a>
+            {tagline_html}
+            <span class="meta">(by @{username}{lineage_html}{tags_html})</span>
+        </li>""")
+
+    # Build tag cloud
+    tag_links = [
+        f'<a href="/directory?tag={escape(quote(t["tag"]))}">{escape(t["tag"])} ({t["daemon_count"]})</a>'
+        for t in tags
+    ]
+
+    body = compress_body(DIRECTORY_TEMPLATE.substitute(
+        tag_links=' | '.join(tag_links) if tag_links else '<em>No tags yet</em>',
+        daemon_rows=''.join(daemon_rows) if daemon_rows else '<li>No daemons yet. Be the first!</li>'
+    ).encode())
+    _directory_page_cache.set("page", (etag, body), generation)
+    return encoded_response(request, body, cache_headers(etag))
+
+
+router.add_route("/directory", serve_directory, methods=["GET"], include_in_schema=False)
+
+
+@router.get("/static/css/{name}.css")
+async def serve_site_stylesheet(request: Request, name: str, v: str = None):
+    """
+    Serve a site stylesheet. Only URLs carrying the current content version
+    are immutable; anything else revalidates so a deploy is picked up.
+    """
+    sheet = SITE_STYLESHEETS.get(name)
+    if sheet is None:
+        raise HTTPException(status_code=404, detail="Stylesheet not found")
+
+    etag = f'"{sheet[1]}"'
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    headers = cache_headers(etag, max_age=300)
+    if v == sheet[1]:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+    return Response(content=sheet[0], media_type="text/css", headers=headers)
+
+
+def page_body(daemon: dict, username: str, handle: str, page_slug: str,
+              cached_only: bool = False) -> Optional[tuple]:
+    """
+    Rendered page as a compress_body() pair, cached per daemon version.
+    With cached_only, returns None rather than rendering.
+    """
+    key = (username, handle, page_slug, daemon["updated_at"])
+    body = _body_cache.get(key)
+    if body is None and not cached_only:
+        body = compress_body(render_page(daemon, username, page_slug).encode())
+        _body_cache.set(key, body)
+    return body
+
+
+def stylesheet_body(daemon: dict, username: str, handle: str,
+                    cached_only: bool = False) -> Optional[tuple]:
+    """
+    Daemon stylesheet as a compress_body() pair, cached per daemon version.
+    With cached_only, returns None rather than encoding it.
+    """
+    key = (username, handle, "style.css", daemon["updated_at"])
+    body = _body_cache.get(key)
+    if body is None and not cached_only:
+        body = compress_body((daemon.get("stylesheet") or "").encode())
+        _body_cache.set(key, body)
+    return body
+
+
+def prime_page_caches(username: str, daemon: dict):
+    """
+    Cache a daemon's current row and render its index page and stylesheet
+    ahead of the first visit (called after a sync). Other pages render on
+    first request.
+    """
+    handle = daemon["handle"]
+    _daemon_cache.set((username, handle), daemon)
+    if daemon["visibility"] == "private":
+        return
+
+    stylesheet_body(daemon, username, handle)
+    page_body(daemon, username, handle, "index")
+
+
+def warm_page_caches(limit: int = 200):
+    """
+    Prime the caches for the most recently updated public daemons, so their
+    first visits after a restart are cache hits.
+    """
+    for row in db.get_public_daemons(limit=limit, sort='recent'):
+        daemon = dict(row)
+        prime_page_caches(daemon.pop("username"), daemon)
 
 
 # ============== Daemon Page Routes (must come after specific routes) ==============
+# Plain Starlette routes like the site pages above: path params are read off
+# the request, so a cached page skips FastAPI's dependency solving entirely.
+# The handlers answer from the caches on the event loop and only hand off to
+# the threadpool when a database query or a render is needed
 
-@router.get("/{username}/{handle}", response_class=HTMLResponse)
-async def serve_daemon_homepage(username: str, handle: str):
+def stylesheet_response(request: Request, username: str, handle: str,
+                        cached_only: bool = False) -> Optional[Response]:
     """
-    Serve a daemon's homepage (index page).
+    Build a daemon stylesheet response. With cached_only, returns None if
+    that would need the database.
     """
-    daemon = db.get_daemon_by_path(username, handle)
-    if not daemon:
-        raise HTTPException(status_code=404, detail="Daemon not found")
+    daemon = resolve_public_daemon(username, handle, cached_only)
+    if daemon is None:
+        return None
 
-    # Check visibility
-    if daemon.get("visibility") == "private":
-        raise HTTPException(status_code=404, detail="Daemon not found")
+    etag = make_etag(daemon["id"], daemon["updated_at"])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    body = stylesheet_body(daemon, username, handle, cached_only)
+    if body is None:
+        return None
 
-    return render_page(daemon, username, "index")
+    headers = cache_headers(etag)
+    if request.query_params.get("v") == stylesheet_version(daemon):
+        # Versioned URL from a rendered page: this content never changes
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
 
+    return encoded_response(request, body, headers, media_type="text/css")
 
-@router.get("/{username}/{handle}/style.css")
-async def serve_stylesheet(username: str, handle: str):
+
+def page_response(request: Request, username: str, handle: str, page_slug: str,
+                  cached_only: bool = False) -> Optional[Response]:
     """
-    Serve a daemon's stylesheet.
+    Build a daemon page response. With cached_only, returns None if that
+    would need the database or a render.
     """
-    daemon = db.get_daemon_by_path(username, handle)
-    if not daemon:
-        raise HTTPException(status_code=404, detail="Daemon not found")
+    daemon = resolve_public_daemon(username, handle, cached_only)
+    if daemon is None:
+        return None
 
-    if daemon.get("visibility") == "private":
-        raise HTTPException(status_code=404, detail="Daemon not found")
+    # Rendered output depends only on the daemon version and the requested page
+    etag = make_etag(daemon["id"], daemon["updated_at"], page_slug)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
 
-    stylesheet = daemon.get("stylesheet", "")
+    body = page_body(daemon, username, handle, page_slug, cached_only)
+    if body is None:
+        return None
 
-    return Response(
-        content=stylesheet,
-        media_type="text/css"
-    )
+    return encoded_response(request, body, cache_headers(etag))
 
 
-@router.get("/{username}/{handle}/{page_slug}", response_class=HTMLResponse)
-async def serve_page(username: str, handle: str, page_slug: str):
+async def serve_stylesheet(request: Request) -> Response:
     """
-    Serve a specific page from a daemon's homepage.
+    Serve a daemon's stylesheet.
     """
-    # Skip style.css - handled above
-    if page_slug == "style.css":
-        return await serve_stylesheet(username, handle)
+    args = (request, request.path_params["username"], request.path_params["handle"])
+    response = stylesheet_response(*args, cached_only=True)
+    if response is None:
+        response = await run_in_threadpool(stylesheet_response, *args)
+    return response
 
-    daemon = db.get_daemon_by_path(username, handle)
-    if not daemon:
-        raise HTTPException(status_code=404, detail="Daemon not found")
 
-    if daemon.get("visibility") == "private":
-        raise HTTPException(status_code=404, detail="Daemon not found")
+async def serve_page(request: Request) -> Response:
+    """
+    Serve a page from a daemon's homepage (the index page when no slug is given).
+    """
+    params = request.path_params
+    args = (request, params["username"], params["handle"], params.get("page_slug", "index"))
+    response = page_response(*args, cached_only=True)
+    if response is None:
+        response = await run_in_threadpool(page_response, *args)
+    return response
+
 
-    return render_page(daemon, username, page_slug)
+router.add_route("/{username}/{handle}", serve_page, methods=["GET"], include_in_schema=False)
+router.add_route("/{username}/{handle}/style.css", serve_stylesheet, methods=["GET"], include_in_schema=False)
+router.add_route("/{username}/{handle}/{page_slug}", serve_page, methods=["GET"], include_in_schema=False)
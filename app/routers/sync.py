@@ -3,28 +3,34 @@ GeoCass Sync Router
 
 Endpoints for vessels to sync daemon homepages.
 """
-import json
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response
 
 from ..auth import get_current_user
 from ..models import SyncRequest, SyncResponse, WhoamiResponse, DaemonResponse
 from .. import database as db
-from ..config import get_settings
+from ..config import Settings, settings_dependency
+from .directory import invalidate_directory_cache, shape_daemon
+from .pages import invalidate_page_caches, prime_page_caches
 
 router = APIRouter(prefix="/api/v1", tags=["sync"])
 
 
 @router.get("/whoami", response_model=WhoamiResponse)
-async def whoami(auth: dict = Depends(get_current_user)):
+def whoami(
+    auth: dict = Depends(get_current_user),
+    settings: Settings = Depends(settings_dependency)
+):
     """
     Verify API key and get user info with their daemons.
     """
     user = auth["user"]
     daemons = db.get_user_daemons(user["id"])
+    username = user["username"]
+    url_prefix = settings.public_url + "/"
 
-    settings = get_settings()
-
-    return {
+    # Encoded directly, so the response model isn't re-validated per row
+    return Response(content=orjson.dumps({
         "user": {
             "id": user["id"],
             "username": user["username"],
@@ -33,29 +39,15 @@ async def whoami(auth: dict = Depends(get_current_user)):
             "bio": user.get("bio"),
             "created_at": user["created_at"]
         },
-        "daemons": [
-            {
-                "id": d["id"],
-                "handle": d["handle"],
-                "display_name": d["display_name"],
-                "tagline": d.get("tagline"),
-                "lineage": d.get("lineage"),
-                "visibility": d.get("visibility", "public"),
-                "tags": json.loads(d["tags_json"]) if d.get("tags_json") else None,
-                "username": user["username"],
-                "url": f"{settings.public_url}/{user['username']}/{d['handle']}",
-                "created_at": d["created_at"],
-                "updated_at": d["updated_at"]
-            }
-            for d in daemons
-        ]
-    }
+        "daemons": [shape_daemon(d, username, url_prefix) for d in daemons]
+    }), media_type="application/json")
 
 
 @router.post("/sync", response_model=SyncResponse)
-async def sync_homepage(
+def sync_homepage(
     request: SyncRequest,
-    auth: dict = Depends(get_current_user)
+    auth: dict = Depends(get_current_user),
+    settings: Settings = Depends(settings_dependency)
 ):
     """
     Sync a daemon's homepage to GeoCass.
@@ -63,22 +55,21 @@ async def sync_homepage(
     Creates the daemon if it doesn't exist, updates if it does.
     """
     user = auth["user"]
-    settings = get_settings()
 
-    # Build homepage JSON
-    homepage_json = json.dumps({
+    # JSON columns are TEXT (JSON1 rejects BLOBs), so decode orjson's bytes
+    homepage_json = orjson.dumps({
         "pages": [p.model_dump() for p in request.homepage.pages],
         "assets": [a.model_dump() for a in request.homepage.assets],
         "featured_artifacts": request.homepage.featured_artifacts
-    })
+    }).decode()
 
     # Build identity meta JSON
     identity_meta_json = None
     if request.identity_meta:
-        identity_meta_json = json.dumps(request.identity_meta.model_dump())
+        identity_meta_json = orjson.dumps(request.identity_meta.model_dump()).decode()
 
     # Tags JSON
-    tags_json = json.dumps(request.tags) if request.tags else None
+    tags_json = orjson.dumps(request.tags).decode() if request.tags else None
 
     # Upsert daemon
     daemon = db.upsert_daemon(
@@ -94,8 +85,11 @@ async def sync_homepage(
         identity_meta_json=identity_meta_json
     )
 
-    # Update tag counts
-    db.update_tag_counts()
+    db.mark_tag_counts_dirty()
+    invalidate_directory_cache()
+    invalidate_page_caches(user["username"], request.daemon_handle)
+    # Render the new version now, so visitors never wait on it
+    prime_page_caches(user["username"], daemon)
 
     return {
         "success": True,
@@ -106,7 +100,7 @@ async def sync_homepage(
 
 
 @router.delete("/daemon/{handle}")
-async def delete_daemon(
+def delete_daemon(
     handle: str,
     auth: dict = Depends(get_current_user)
 ):
@@ -120,11 +114,10 @@ async def delete_daemon(
         raise HTTPException(status_code=404, detail="Daemon not found")
 
     # Delete from database
-    from ..database import get_db
-    with get_db() as conn:
-        conn.execute("DELETE FROM daemons WHERE id = ?", (daemon["id"],))
+    db.delete_daemon(daemon["id"])
 
-    # Update tag counts
-    db.update_tag_counts()
+    db.mark_tag_counts_dirty()
+    invalidate_directory_cache()
+    invalidate_page_caches(user["username"], handle)
 
     return {"success": True, "deleted": handle}
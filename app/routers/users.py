@@ -6,7 +6,10 @@ User registration, login, and API key management.
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
 
-from ..auth import get_current_user, hash_password, verify_password, generate_api_key
+from ..auth import (
+    get_current_user, hash_password, verify_password, generate_api_key,
+    invalidate_api_key
+)
 from ..models import (
     UserCreate, UserLogin, UserResponse,
     APIKeyCreate, APIKeyResponse, APIKeyCreated
@@ -17,7 +20,7 @@ router = APIRouter(prefix="/api/v1", tags=["users"])
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(request: UserCreate):
+def register(request: UserCreate):
     """
     Register a new user account.
     """
@@ -52,7 +55,7 @@ async def register(request: UserCreate):
 
 
 @router.post("/login")
-async def login(request: UserLogin):
+def login(request: UserLogin):
     """
     Login and get user info + first API key.
 
@@ -95,7 +98,7 @@ async def login(request: UserLogin):
 
 
 @router.post("/keys", response_model=APIKeyCreated)
-async def create_api_key(
+def create_api_key(
     request: APIKeyCreate,
     auth: dict = Depends(get_current_user)
 ):
@@ -129,7 +132,7 @@ async def create_api_key(
 
 
 @router.get("/keys", response_model=list[APIKeyResponse])
-async def list_api_keys(auth: dict = Depends(get_current_user)):
+def list_api_keys(auth: dict = Depends(get_current_user)):
     """
     List all API keys for the current user.
     """
@@ -140,16 +143,16 @@ async def list_api_keys(auth: dict = Depends(get_current_user)):
         {
             "id": k["id"],
             "key_prefix": k["key_prefix"],
-            "label": k.get("label"),
+            "label": k["label"],
             "created_at": k["created_at"],
-            "last_used_at": k.get("last_used_at")
+            "last_used_at": k["last_used_at"]
         }
         for k in keys
     ]
 
 
 @router.delete("/keys/{key_id}")
-async def delete_api_key(
+def delete_api_key(
     key_id: str,
     auth: dict = Depends(get_current_user)
 ):
@@ -168,5 +171,6 @@ async def delete_api_key(
         raise HTTPException(status_code=400, detail="Cannot delete the API key you're currently using")
 
     db.delete_api_key(key_id)
+    invalidate_api_key(key_id)
 
     return {"success": True, "deleted": key_id}